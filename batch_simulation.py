@@ -0,0 +1,385 @@
+"""Lockstep simulation of many AI-only rounds of the switch game.
+
+The state of a whole batch of games is held in NumPy arrays and every
+game is advanced by one turn per step, using vectorized equivalents of the
+SimpleAI and SmartAI strategies. Requires NumPy.
+
+The vectorized strategies are also available on their own, so that other
+lockstep simulators can ask for the decisions of many tables in one call:
+smart_select_cards and smart_select_card_options make the same choices as
+SmartAI.select_card and SmartAI.select_card_option, and simple_select_cards
+and simple_select_card_options those of SimpleAI for the same random draws.
+Their inputs are arrays with one row per table, which choice_masks,
+hand_counts and size_rows build from the arguments of the scalar methods.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from cards import Card, DECK
+from players import DEFAULT_WEIGHTS, count_hand
+from switch import DISCARD_TABLE, HAND_SIZE
+
+
+# Per-game results of a batch: arrays of the winner's seat index
+# (-1 if the game was aborted), the number of turns and the number of reshuffles.
+BatchResult = namedtuple('BatchResult', ['winner', 'turns', 'reshuffles'])
+
+# Discard legality, indexed by top card id and card id.
+PLAYABLE = np.array(DISCARD_TABLE, dtype=bool)
+# Suit and rank ids of every card, and a card x suit one-hot matrix for counting suits.
+SUIT = np.array([card.suit_id for card in DECK])
+RANK = np.array([card.rank_id for card in DECK])
+SUIT_ONEHOT = np.eye(4, dtype=np.int64)[SUIT]
+RANK_2, RANK_8, RANK_J, RANK_Q, RANK_K, RANK_A = (Card.values.index(v) for v in '2 8 J Q K A'.split())
+IS_J = RANK == RANK_J
+IS_QA = (RANK == RANK_Q) | (RANK == RANK_A)
+# Score of cards that cannot be discarded.
+NO_SCORE = -np.inf
+
+
+def choice_masks(choices):
+    """Return a bool array (tables, 52), True for the cards of every table's list of choices."""
+    masks = np.zeros((len(choices), len(DECK)), dtype=bool)
+    rows = np.repeat(np.arange(len(choices)), [len(cards) for cards in choices])
+    masks[rows, [card.id for cards in choices for card in cards]] = True
+    return masks
+
+
+def hand_counts(hands):
+    """Return an int array (tables, 52) of the number of copies of every card in every table's hand."""
+    return np.array([count_hand(hand).card_counts for hand in hands], dtype=np.int64).reshape(-1, len(DECK))
+
+
+def size_rows(sizes):
+    """Return an int array (tables, seats) of the normalized hand sizes of every table.
+
+    Parameters:
+    sizes - sequence of the hand sizes of every table as returned by
+        Switch.get_normalized_hand_sizes. All tables must have the same number of seats.
+    """
+    return np.array([sizes_of_table[:] for sizes_of_table in sizes], dtype=np.int64)
+
+
+def rank_offsets(weights=DEFAULT_WEIGHTS):
+    """Return the SmartAI.select_card score offsets of the ranks; J and K offsets depend on the hand sizes."""
+    offsets = np.zeros(len(Card.values))
+    offsets[[RANK_Q, RANK_2, RANK_8, RANK_A]] = [weights['draw4'], weights['draw2'], weights['skip'], weights['any']]
+    return offsets
+
+
+def simple_select_cards(choices, draws):
+    """Vectorized SimpleAI.select_card.
+
+    Parameters:
+    choices - bool array (tables, 52) of the cards that can be discarded, see choice_masks;
+    draws - float array (tables,) of random numbers in [0, 1).
+
+    SimpleAI picks one of its choices, each listed twice, and no discard,
+    listed once. A table whose rng.choice(options) is
+    options[int(draw * len(options))] picks the returned card.
+    Returns an int array of the selected card ids, -1 for no discard.
+    """
+    count = choices.sum(axis=1)
+    options = (draws * (2 * count + 1)).astype(np.int64)
+    nth = options % np.maximum(count, 1)
+    card = (choices.cumsum(axis=1) > nth[:, None]).argmax(axis=1)
+    return np.where(options < 2 * count, card, -1)
+
+
+def simple_select_card_options(draws):
+    """Vectorized SimpleAI.select_card_option: True to discard a drawn card, for random numbers in [0, 1)."""
+    return draws < 0.5
+
+
+def smart_select_cards(choices, hands, sizes, weights=DEFAULT_WEIGHTS):
+    """Vectorized SmartAI.select_card.
+
+    Parameters:
+    choices - bool array (tables, 52) of the cards that can be discarded, see choice_masks;
+    hands - int array (tables, 52) of the copies of every card in hand, see hand_counts;
+    sizes - int array (tables, seats) of the normalized hand sizes, see size_rows.
+
+    Keyword arguments:
+    weights - dict of the SmartAI weights shared by all tables (default DEFAULT_WEIGHTS).
+        Tables of players with other weights are decided in a call per weights.
+
+    Returns an int array of the selected card ids, -1 for no discard.
+    Ties are broken towards the lowest card id, the order of the choices of a Hand.
+    """
+    tables = len(choices)
+    suits, ranks = len(Card.suits), len(Card.values)
+    # Card ids run through the ranks of one suit after another, so scores
+    # are computed as (tables, suits, ranks) arrays by broadcasting.
+    offsets = np.tile(rank_offsets(weights), (tables, 1))
+    offsets[:, RANK_K] = np.where(sizes[:, -1] > sizes[:, 1], weights['reverse'], weights['reverse_other'])
+    hands = hands.reshape(tables, suits, ranks)
+    in_suit = hands.sum(axis=2)[:, :, None] - (hands > 0)
+    score = offsets[:, None, :] + weights['suit'] * in_suit
+    score[:, :, RANK_J] = (weights['swap'] * (sizes[:, 0] - 1 - sizes[:, 1:].min(axis=1)))[:, None]
+    score = np.where(choices.reshape(tables, suits, ranks), score, NO_SCORE).reshape(tables, len(DECK))
+    best = score.argmax(axis=1)
+    return np.where(score[np.arange(tables), best] > weights['threshold'], best, -1)
+
+
+def smart_select_card_options(cards, hands, sizes, weights=DEFAULT_WEIGHTS):
+    """Vectorized SmartAI.select_card_option.
+
+    Parameters:
+    cards - int array (tables,) of the ids of the drawn cards;
+    hands - int array (tables, 52) of the copies of every card in hand, including the drawn card;
+    sizes - int array (tables, seats) of the normalized hand sizes.
+
+    Keyword arguments:
+    weights - dict of the SmartAI weights shared by all tables (default DEFAULT_WEIGHTS).
+        Tables of players with other weights are decided in a call per weights.
+
+    Returns a bool array, True to discard the drawn card.
+    """
+    rows = np.arange(len(cards))
+    held = hands[rows, cards] > 0
+    suit_counts = hands @ SUIT_ONEHOT
+    suit_counts[rows, SUIT[cards]] -= held
+    same_suit = suit_counts[rows, SUIT[cards]]
+    different_suits = (suit_counts > 0).sum(axis=1)
+    qa_in_hand = hands[:, IS_QA].sum(axis=1) - (held & IS_QA[cards])
+    size = hands.sum(axis=1)
+    smallest = sizes[:, 1:].min(axis=1)
+
+    keep_j = IS_J[cards] & (weights['keep_j'] > 0) & (size < smallest)
+    keep_few_suits = ((IS_QA[cards] & (qa_in_hand == 0) & (weights['keep_qa'] > 0))
+                      | ((same_suit == 0) & (weights['keep_new_suit'] > 0)))
+    keep = np.where(size >= 2, np.where(different_suits < 4, keep_few_suits, keep_j), keep_j)
+    return ~keep
+
+
+class BatchSwitch:
+    """A batch of Switch rounds played in lockstep.
+
+    All games share the same seat line-up of 'simple' and 'smart' AIs.
+    BatchSwitch objects have the following attributes, with one row per game:
+
+    self.hands - bool array (games, seats, 52), True for cards in a player's hand;
+    self.stock - int array (games, 52) of card ids, the first stock_len entries are the stock;
+    self.discards - int array (games, 52) of card ids, the first discard_len entries are the discards;
+    self.skip, self.draw2, self.draw4 - bool arrays of game flags;
+    self.direction - int array of game directions, either 1 or -1;
+    self.current - int array of current seat indices;
+    self.done - bool array, True for finished or aborted games.
+    """
+    def __init__(self, seats, games, seed=None, max_turns=10000):
+        for typ in seats:
+            if typ not in ('simple', 'smart'):
+                raise ValueError(f"Seat type must be 'simple' or 'smart': {typ!r}")
+        if not 2 <= len(seats) or len(seats) * HAND_SIZE >= len(DECK):
+            raise ValueError(f"Unsupported number of seats: {len(seats)}")
+        self.seats = len(seats)
+        self.games = games
+        self.smart = np.array([typ == 'smart' for typ in seats])
+        self.rng = np.random.default_rng(seed)
+        self.max_turns = max_turns
+
+        self.hands = np.zeros((games, self.seats, len(DECK)), dtype=bool)
+        self.stock = np.zeros((games, len(DECK)), dtype=np.int64)
+        self.stock_len = np.zeros(games, dtype=np.int64)
+        self.discards = np.zeros((games, len(DECK)), dtype=np.int64)
+        self.discard_len = np.zeros(games, dtype=np.int64)
+        self.skip = np.zeros(games, dtype=bool)
+        self.draw2 = np.zeros(games, dtype=bool)
+        self.draw4 = np.zeros(games, dtype=bool)
+        self.direction = np.ones(games, dtype=np.int64)
+        self.current = np.zeros(games, dtype=np.int64)
+        self.done = np.zeros(games, dtype=bool)
+        self.winner = np.full(games, -1, dtype=np.int64)
+        self.turns = np.zeros(games, dtype=np.int64)
+        self.reshuffles = np.zeros(games, dtype=np.int64)
+
+    def run(self):
+        """Run all games of the batch until they are won or aborted.
+
+        Returns a BatchResult.
+        """
+        self.setup_round()
+        while not self.done.all():
+            self.step()
+        return BatchResult(self.winner.copy(), self.turns.copy(), self.reshuffles.copy())
+
+    def setup_round(self):
+        """Shuffle a deck for every game, start the discard piles and deal all hands."""
+        deck = np.tile(np.arange(len(DECK)), (self.games, 1))
+        self.stock[:] = self.rng.permuted(deck, axis=1)
+        self.discards[:, 0] = self.stock[:, -1]
+        self.discard_len[:] = 1
+        self.stock_len[:] = len(DECK) - 1
+        self.hands[:] = False
+        games = np.arange(self.games)
+        for seat in range(self.seats):
+            self._pick_up(games, np.full(self.games, seat), HAND_SIZE)
+        self.skip[:] = self.draw2[:] = self.draw4[:] = self.done[:] = False
+        self.direction[:] = 1
+        self.current[:] = 0
+        self.winner[:] = -1
+        self.turns[:] = 0
+        self.reshuffles[:] = 0
+
+    def step(self):
+        """Advance every unfinished game by a single turn."""
+        games = np.flatnonzero(~self.done)
+        seats = self.current[games]
+        self.turns[games] += 1
+
+        # Skipped players do nothing else this turn.
+        skipped = self.skip[games]
+        self.skip[games[skipped]] = False
+        active, players = games[~skipped], seats[~skipped]
+
+        # Apply pending penalties.
+        for flag, amount in ((self.draw2, 2), (self.draw4, 4)):
+            penalized = flag[active]
+            if penalized.any():
+                self._pick_up(active[penalized], players[penalized], amount)
+                flag[active[penalized]] = False
+
+        # Have the players select a card.
+        top = self.discards[active, self.discard_len[active] - 1]
+        playable = self.hands[active, players] & PLAYABLE[top]
+        chosen = np.full(active.size, -1)
+        smart = self.smart[players]
+        if (~smart).any():
+            chosen[~smart] = self._simple_select_card(playable[~smart])
+        if smart.any():
+            chosen[smart] = self._smart_select_card(active[smart], players[smart], playable[smart])
+        discarded = chosen >= 0
+        self._discard(active[discarded], players[discarded], chosen[discarded])
+
+        # Draw a card and discard if eligible.
+        drawing, players, top = active[~discarded], players[~discarded], top[~discarded]
+        picked, card = self._pick_up(drawing, players, 1)
+        eligible = (picked > 0) & PLAYABLE[top, card]
+        drawing, players, card = drawing[eligible], players[eligible], card[eligible]
+        choice = np.zeros(drawing.size, dtype=bool)
+        smart = self.smart[players]
+        choice[~smart] = simple_select_card_options(self.rng.random((~smart).sum()))
+        choice[smart] = self._smart_select_card_option(drawing[smart], players[smart], card[smart])
+        self._discard(drawing[choice], players[choice], card[choice])
+
+        # Advance the current player depending on the game's direction.
+        playing = games[~self.done[games]]
+        self.current[playing] = (self.current[playing] + self.direction[playing]) % self.seats
+        aborted = playing[self.turns[playing] >= self.max_turns]
+        self.done[aborted] = True
+
+    def _hand_sizes(self, games, players):
+        """Return the normalized hand sizes (games, seats) of the given games' players."""
+        sizes = self.hands[games].sum(axis=2)
+        steps = np.arange(self.seats) * self.direction[games][:, None]
+        return np.take_along_axis(sizes, (players[:, None] + steps) % self.seats, axis=1)
+
+    def _simple_select_card(self, playable):
+        """Vectorized SimpleAI.select_card."""
+        return simple_select_cards(playable, self.rng.random(len(playable)))
+
+    def _smart_select_card(self, games, players, playable):
+        """Vectorized SmartAI.select_card."""
+        hands = self.hands[games, players].astype(np.int64)
+        return smart_select_cards(playable, hands, self._hand_sizes(games, players))
+
+    def _smart_select_card_option(self, games, players, card):
+        """Vectorized SmartAI.select_card_option for a drawn card."""
+        hands = self.hands[games, players].astype(np.int64)
+        return smart_select_card_options(card, hands, self._hand_sizes(games, players))
+
+    def _discard(self, games, players, cards):
+        """Discard a card in each of the given games and apply its effects."""
+        if not games.size:
+            return
+        self.hands[games, players, cards] = False
+        self.discards[games, self.discard_len[games]] = cards
+        self.discard_len[games] += 1
+
+        # Players with an empty hand won.
+        won = ~self.hands[games, players].any(axis=1)
+        self.winner[games[won]] = players[won]
+        self.done[games[won]] = True
+        games, players, rank = games[~won], players[~won], RANK[cards[~won]]
+
+        self.skip[games[rank == RANK_8]] = True
+        self.draw2[games[rank == RANK_2]] = True
+        self.draw4[games[rank == RANK_Q]] = True
+        self.direction[games[rank == RANK_K]] *= -1
+        swapping = rank == RANK_J
+        if swapping.any():
+            self._swap_hands(games[swapping], players[swapping])
+
+    def _swap_hands(self, games, players):
+        """Have the given players choose another player and swap hands with them."""
+        smart = self.smart[players]
+        # SimpleAI swaps with a random other player.
+        offset = self.rng.integers(1, self.seats, size=games.size)
+        target = (players + offset) % self.seats
+        # SmartAI swaps with a random player among those holding the least cards.
+        if smart.any():
+            sizes = self.hands[games[smart]].sum(axis=2)
+            sizes[np.arange(sizes.shape[0]), players[smart]] = len(DECK) + 1
+            candidates = sizes == sizes.min(axis=1)[:, None]
+            target[smart] = (self.rng.random(candidates.shape) * candidates).argmax(axis=1)
+        hands = self.hands[games, players].copy()
+        self.hands[games, players] = self.hands[games, target]
+        self.hands[games, target] = hands
+
+    def _pick_up(self, games, players, amount):
+        """Pick up cards from stock into the given players' hands.
+
+        Returns the number of cards picked and the id of the last picked card per game.
+        """
+        picked = np.zeros(games.size, dtype=np.int64)
+        last = np.zeros(games.size, dtype=np.int64)
+        for _ in range(amount):
+            for game in games[self.stock_len[games] == 0]:
+                self._reshuffle(game)
+            available = self.stock_len[games] > 0
+            drawing = games[available]
+            self.stock_len[drawing] -= 1
+            card = self.stock[drawing, self.stock_len[drawing]]
+            self.hands[drawing, players[available], card] = True
+            picked[available] += 1
+            last[available] = card
+        return picked, last
+
+    def _reshuffle(self, game):
+        """Shuffle all discards but the top card back into the stock of a game."""
+        count = self.discard_len[game] - 1
+        if not count:
+            return
+        self.stock[game, :count] = self.rng.permutation(self.discards[game, :count])
+        self.stock_len[game] = count
+        self.discards[game, 0] = self.discards[game, count]
+        self.discard_len[game] = 1
+        self.reshuffles[game] += 1
+
+
+def play_batch(seats, games, seed=None, max_turns=10000):
+    """Play a batch of lockstep rounds for a seat line-up.
+
+    Parameters:
+    seats - sequence of 'simple' and 'smart' seat types;
+    games - number of games in the batch.
+
+    Keyword arguments:
+    seed - seed of the batch's random generator (default None);
+    max_turns - number of turns after which a game is aborted (default 10000).
+
+    Returns a BatchResult.
+    """
+    return BatchSwitch(seats, games, seed, max_turns).run()
+
+
+if __name__ == '__main__':
+    import time
+
+    start = time.perf_counter()
+    result = play_batch(['simple', 'smart', 'smart'], 20000, seed=0)
+    elapsed = time.perf_counter() - start
+    print(f"Win rates: {np.bincount(result.winner[result.winner >= 0], minlength=3) / result.winner.size}")
+    print(f"Average turns: {result.turns.mean():.1f}")
+    print(f"{result.winner.size / elapsed:.1f} games/sec")
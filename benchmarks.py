@@ -0,0 +1,438 @@
+"""Benchmarks of hot paths of the switch game.
+
+Run all benchmarks and compare them with a saved baseline with
+
+    $ python3 benchmarks.py
+
+Rates are reported in operations per second. Every benchmark uses fixed
+seeds, and the best of several repetitions is reported to keep the numbers stable.
+
+Show how the cost of a turn grows with the numbers of seats and decks with
+
+    $ python3 benchmarks.py --scaling
+
+Show the memory of resident tables, live and compacted, with
+
+    $ python3 benchmarks.py --memory
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+
+from cards import DECK, Card, CountedHand, Hand, generate_deck
+from compact import compact
+from saves import load_table, save_table
+from events import NullEventBus
+from players import SmartAI
+from simulation import HeadlessSwitch, create_players
+from switch import HAND_SIZE, Switch, is_discardable
+
+try:
+    import batch_simulation
+except ImportError:
+    # The batched benchmarks need NumPy, which is optional.
+    batch_simulation = None
+
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+SEATS = ('simple', 'smart', 'smart')
+# Numbers of seats of the scaling benchmark. Each is played with the fewest
+# decks that deal all hands and with four times as many.
+SCALING_SEATS = (4, 16, 64, 128, 256)
+# Number of resident tables of the memory benchmark.
+MEMORY_TABLES = 100000
+# Number of tables asked for a decision at once by the batched decision benchmarks.
+DECISION_TABLES = 10000
+
+# Registered benchmarks by name. Each is a function that returns
+# a callable to be timed and the number of operations per call.
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark function under a name."""
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def quiet_game(seats=SEATS):
+    """Return a Switch game without event subscribers and a dealt round."""
+    random.seed(0)
+    game = Switch(NullEventBus())
+    game.players = create_players(seats)
+    game.setup_round()
+    return game
+
+
+@benchmark('can_discard')
+def bench_can_discard():
+    game = quiet_game()
+    game.discards = [Card('♣', '5')]
+    cards = generate_deck()
+
+    def run():
+        can_discard = game.can_discard
+        for card in cards:
+            can_discard(card)
+    return run, len(cards)
+
+
+@benchmark('can_discard (strings)')
+def bench_can_discard_strings():
+    game = quiet_game()
+    game.discards = [Card('♣', '5')]
+    cards = generate_deck()
+
+    def run():
+        for card in cards:
+            is_discardable(card, game.discards[-1])
+    return run, len(cards)
+
+
+@benchmark('pick_up_card')
+def bench_pick_up_card():
+    game = quiet_game()
+    player = game.players[0]
+    deck = generate_deck()
+
+    def run():
+        game.stock = deck[:]
+        player.hand = []
+        for _ in range(40):
+            game.pick_up_card(player)
+    return run, 40
+
+
+@benchmark('pick_up_card (reshuffle)')
+def bench_pick_up_card_reshuffle():
+    game = quiet_game()
+    player = game.players[0]
+    deck = generate_deck()
+
+    def run():
+        random.seed(0)
+        for _ in range(10):
+            game.stock = []
+            game.discards = deck[:40]
+            player.hand = []
+            game.pick_up_card(player)
+    return run, 10
+
+
+@benchmark('get_normalized_hand_sizes')
+def bench_get_normalized_hand_sizes():
+    game = quiet_game(('smart', 'smart', 'smart', 'smart'))
+    players = game.players
+
+    def run():
+        for direction in (1, -1):
+            game.direction = direction
+            for player in players:
+                game.get_normalized_hand_sizes(player)
+    return run, 2 * len(players)
+
+
+@benchmark('SmartAI.select_card')
+def bench_select_card():
+    player = SmartAI('Smart')
+    player.hand = CountedHand(generate_deck()[::4])
+    choices = player.hand[::2]
+    hands = [len(player.hand), 5, 9]
+
+    def run():
+        for _ in range(10):
+            player.select_card(choices, hands)
+    return run, 10
+
+
+@benchmark('SmartAI.select_card_option')
+def bench_select_card_option():
+    game = quiet_game(('smart', 'smart', 'smart'))
+    player = game.players[0]
+    others = game.players[1:]
+    cards = generate_deck()[::5]
+
+    def run():
+        for card in cards:
+            player.select_card_option(card, others)
+    return run, len(cards)
+
+
+def decision_tables(tables=DECISION_TABLES, seats=len(SEATS), seed=0):
+    """Return the hands, choices and normalized hand sizes of random SmartAI card selections at many tables."""
+    rng = random.Random(seed)
+    hands, choices, sizes = [], [], []
+    for _ in range(tables):
+        hand = Hand(rng.sample(DECK, rng.randint(1, 2 * HAND_SIZE)))
+        hands.append(hand)
+        choices.append(hand.matching(rng.choice(DECK)) or [hand[-1]])
+        sizes.append([len(hand)] + [rng.randint(1, 2 * HAND_SIZE) for _ in range(seats - 1)])
+    return hands, choices, sizes
+
+
+@benchmark('SmartAI.select_card (tables)')
+def bench_select_card_tables():
+    player = SmartAI('Smart')
+    hands, choices, sizes = decision_tables()
+
+    def run():
+        for hand, cards, table_sizes in zip(hands, choices, sizes):
+            player.hand = hand
+            player.select_card(cards, table_sizes)
+    return run, len(hands)
+
+
+if batch_simulation is not None:
+    @benchmark('smart_select_cards')
+    def bench_smart_select_cards():
+        hands, choices, sizes = decision_tables()
+        arrays = (batch_simulation.choice_masks(choices), batch_simulation.hand_counts(hands),
+                  batch_simulation.size_rows(sizes))
+
+        def run():
+            batch_simulation.smart_select_cards(*arrays)
+        return run, len(hands)
+
+    @benchmark('smart_select_cards (from hands)')
+    def bench_smart_select_cards_from_hands():
+        hands, choices, sizes = decision_tables()
+
+        def run():
+            batch_simulation.smart_select_cards(batch_simulation.choice_masks(choices),
+                                                batch_simulation.hand_counts(hands),
+                                                batch_simulation.size_rows(sizes))
+        return run, len(hands)
+
+
+@benchmark('setup_round')
+def bench_setup_round():
+    game = quiet_game()
+
+    def run():
+        random.seed(0)
+        for _ in range(10):
+            for player in game.players:
+                player.hand = []
+            game.setup_round()
+    return run, 10
+
+
+@benchmark('Switch.run_round')
+def bench_run_round():
+    game = quiet_game()
+
+    def run():
+        random.seed(0)
+        for _ in range(10):
+            game.players = create_players(SEATS)
+            game.run_round()
+    return run, 10
+
+
+@benchmark('HeadlessSwitch.run_round')
+def bench_headless_run_round():
+    game = HeadlessSwitch(create_players(SEATS))
+
+    def run():
+        random.seed(0)
+        for _ in range(10):
+            game.run_round()
+    return run, 10
+
+
+def large_table(seats, decks):
+    """Return a HeadlessSwitch with SEATS repeated across a number of seats and decks."""
+    players = create_players([SEATS[idx % len(SEATS)] for idx in range(seats)])
+    return HeadlessSwitch(players, decks=decks, max_players=seats)
+
+
+def play_turns(game, turns):
+    """Play a number of turns of a game, dealing a new round whenever one is won.
+
+    Returns the seconds spent playing, not counting the deals.
+    """
+    elapsed = 0.0
+    while turns > 0:
+        game.deal()
+        start = time.perf_counter()
+        game.play(turns)
+        elapsed += time.perf_counter() - start
+        turns -= game.turns
+    return elapsed
+
+
+@benchmark('save_table')
+def bench_save_table():
+    game = quiet_game()
+
+    def run():
+        for _ in range(100):
+            save_table(game)
+    return run, 100
+
+
+@benchmark('load_table')
+def bench_load_table():
+    data = save_table(quiet_game())
+    game = HeadlessSwitch()
+
+    def run():
+        for _ in range(100):
+            load_table(data, game)
+    return run, 100
+
+
+@benchmark('HeadlessSwitch turn (128 seats)')
+def bench_large_table_turn():
+    game = large_table(128, 18)
+
+    def run():
+        random.seed(0)
+        play_turns(game, 200)
+    return run, 200
+
+
+def scaling(seats=SCALING_SEATS, turns=5000):
+    """Measure the cost of a turn of HeadlessSwitch as seats and decks grow.
+
+    Keyword arguments:
+    seats - numbers of seats to measure;
+    turns - number of turns played at every size.
+
+    Returns a list of (seats, decks, microseconds per turn) tuples.
+    """
+    results = []
+    for count in seats:
+        fewest = count * HAND_SIZE // len(DECK) + 1
+        for decks in (fewest, 4 * fewest):
+            random.seed(0)
+            elapsed = play_turns(large_table(count, decks), turns)
+            results.append((count, decks, elapsed / turns * 1e6))
+    return results
+
+
+def memory(tables=MEMORY_TABLES, seats=SEATS):
+    """Measure the memory of resident tables with freshly dealt rounds.
+
+    Keyword arguments:
+    tables - number of tables kept resident at once;
+    seats - sequence of player_classes keys of the players of every table.
+
+    All tables are created and dealt, then compacted while the live games are
+    dropped. Returns a tuple (bytes per live HeadlessSwitch, bytes per CompactTable).
+    """
+    random.seed(0)
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        games = []
+        for _ in range(tables):
+            game = HeadlessSwitch(create_players(seats))
+            game.setup_round()
+            games.append(game)
+        live = tracemalloc.get_traced_memory()[0] - start
+        compacted = []
+        for idx, game in enumerate(games):
+            compacted.append(compact(game))
+            games[idx] = None
+        del games
+        packed = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return live / tables, packed / tables
+
+
+def run_benchmarks(names=None, repeat=5, min_time=0.2):
+    """Run benchmarks and return their rates.
+
+    Keyword arguments:
+    names - names of the benchmarks to run, or None to run all (default None);
+    repeat - number of repetitions of which the best is taken (default 5);
+    min_time - minimum duration of a single repetition in seconds (default 0.2).
+
+    Returns a dict of operations per second by benchmark name.
+    """
+    rates = {}
+    for name in names or BENCHMARKS:
+        run, ops = BENCHMARKS[name]()
+        timer = timeit.Timer(run)
+        number, _ = timer.autorange()
+        number = max(1, int(number * min_time / 0.2))
+        best = min(timer.repeat(repeat=repeat, number=number))
+        rates[name] = ops * number / best
+    return rates
+
+
+def find_regressions(rates, baseline, tolerance=0.15):
+    """Return the benchmarks that are slower than their baseline.
+
+    Parameters:
+    rates - dict of operations per second by benchmark name;
+    baseline - dict of baseline operations per second by benchmark name.
+
+    Keyword arguments:
+    tolerance - relative slowdown that is accepted (default 0.15).
+
+    Returns a list of (name, baseline rate, rate) tuples.
+    """
+    return [(name, baseline[name], rate) for name, rate in rates.items()
+            if name in baseline and rate < baseline[name] * (1 - tolerance)]
+
+
+def main():
+    """Run the benchmarks from the command line and compare them with a baseline."""
+    parser = argparse.ArgumentParser(description="Benchmark hot paths of the switch game.")
+    parser.add_argument('names', nargs='*', help="benchmarks to run (default: all)")
+    parser.add_argument('-b', '--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('-s', '--save', action='store_true', help="save the results as the new baseline")
+    parser.add_argument('-t', '--tolerance', type=float, default=0.15, help="accepted relative slowdown")
+    parser.add_argument('--scaling', action='store_true', help="show the cost of a turn by seats and decks")
+    parser.add_argument('--memory', action='store_true', help="show the bytes per resident table")
+    parser.add_argument('--tables', type=int, default=MEMORY_TABLES, help="resident tables of --memory")
+    args = parser.parse_args()
+    if args.scaling:
+        print(f"{'seats':>6} {'decks':>6} {'us/turn':>8}")
+        for seats, decks, cost in scaling():
+            print(f"{seats:6} {decks:6} {cost:8.2f}")
+        return 0
+    if args.memory:
+        live, packed = memory(args.tables)
+        print(f"{args.tables:,} resident tables of {len(SEATS)} seats")
+        print(f"HeadlessSwitch: {live:8,.0f} bytes/table")
+        print(f"CompactTable:   {packed:8,.0f} bytes/table")
+        return 0
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}, choose from: {', '.join(BENCHMARKS)}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    rates = run_benchmarks(args.names)
+    for name, rate in rates.items():
+        change = f"{rate / baseline[name] - 1:+8.1%}" if name in baseline else ''
+        print(f"{name:30} {rate:14,.0f} ops/sec {change}")
+
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump({**baseline, **rates}, file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    regressions = find_regressions(rates, baseline, args.tolerance)
+    for name, base_rate, rate in regressions:
+        print(f"REGRESSION: {name} {rate:,.0f} ops/sec, baseline {base_rate:,.0f} ops/sec")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
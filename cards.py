@@ -1,24 +1,317 @@
 """Cards for the switch game."""
-from collections import namedtuple
 
 
-class Card(namedtuple('CardData', ['suit', 'value'])):
+class Card:
     """A switch card.
 
-    A Card object is a namedtuple with the fields 'suit' and 'value'.
+    Cards are interned: there is exactly one Card object for each of the
+    52 combinations of suit and value, so Card('♣', '2') is Card('♣', '2')
+    and comparing or removing cards only compares object identities.
+
+    A Card object has the fields 'suit' and 'value' as well as the
+    precomputed integer fields 'id' (0-51), 'suit_id' (0-3), 'rank_id' (0-12)
+    and 'mask' (1 << id), the card's bit in a hand bitmask.
     """
+    __slots__ = ('suit', 'value', 'id', 'suit_id', 'rank_id', 'mask')
     suits = '♣ ♢ ♡ ♠'.split()
     values = '2 3 4 5 6 7 8 9 10 J Q K A'.split()
+    _interned = {}
 
     def __new__(cls, suit, value):
-        assert suit in cls.suits
-        assert value in cls.values
-        return super().__new__(cls, suit, value)
+        try:
+            return cls._interned[suit, value]
+        except KeyError:
+            raise ValueError(f"Invalid card: {suit} {value}") from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Cards are immutable")
 
     def __str__(self):
         return '{} {}'.format(self.suit, self.value)
 
+    def __repr__(self):
+        return f"Card(suit={self.suit!r}, value={self.value!r})"
+
+    def __reduce__(self):
+        return Card, (self.suit, self.value)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _intern_cards():
+    """Create the 52 Card singletons, ordered by their id."""
+    deck = []
+    for suit_id, suit in enumerate(Card.suits):
+        for rank_id, value in enumerate(Card.values):
+            card = object.__new__(Card)
+            card_id = len(deck)
+            fields = (suit, value, card_id, suit_id, rank_id, 1 << card_id)
+            for name, field in zip(Card.__slots__, fields):
+                object.__setattr__(card, name, field)
+            Card._interned[suit, value] = card
+            deck.append(card)
+    return tuple(deck)
+
+
+# All cards of a deck, where DECK[i].id == i.
+DECK = _intern_cards()
+
+# Rank ids of Q and A, which can always be discarded.
+QA_RANKS = (Card.values.index('Q'), Card.values.index('A'))
+
+# Masks of the cards of a suit and of a rank, indexed by suit_id and rank_id.
+# Card ids run through the ranks of one suit after another, so a suit is a run of 13 bits.
+SUIT_MASKS = tuple(sum(card.mask for card in DECK if card.suit_id == suit_id) for suit_id in range(len(Card.suits)))
+RANK_MASKS = tuple(sum(card.mask for card in DECK if card.rank_id == rank_id) for rank_id in range(len(Card.values)))
+QA_MASK = RANK_MASKS[QA_RANKS[0]] | RANK_MASKS[QA_RANKS[1]]
+
+
+def generate_deck(decks=1):
+    """Return a list of the cards of a number of decks, ordered by id within each deck."""
+    return list(DECK) * decks
+
+
+def cards_in_mask(mask):
+    """Return the list of cards whose bits are set in a 52-bit mask, ordered by id."""
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(DECK[low.bit_length() - 1])
+        mask ^= low
+    return cards
+
+
+class MaskHand(list):
+    """A hand of cards that also keeps a 52-bit mask of its cards.
+
+    A MaskHand is a list of cards and can be used wherever a hand is
+    expected. The attribute 'mask' has the bit Card.mask set for every card
+    in the hand and is kept up to date by all list operations, so
+    membership and matching against sets of cards are single int operations.
+    In games with several decks a hand may hold copies of a card; its bit
+    stays set until the last copy is removed.
+    """
+    def __init__(self, cards=()):
+        super().__init__(cards)
+        self._update_mask()
+
+    def _update_mask(self):
+        """Recompute the mask from the cards in the hand."""
+        self.mask = 0
+        for card in self:
+            self.mask |= card.mask
+
+    def append(self, card):
+        super().append(card)
+        self.mask |= card.mask
+
+    def extend(self, cards):
+        super().extend(cards)
+        self._update_mask()
+
+    def insert(self, index, card):
+        super().insert(index, card)
+        self.mask |= card.mask
+
+    def _forget(self, card):
+        """Clear the bit of a removed card unless the hand holds another copy of it."""
+        if card not in self:
+            self.mask ^= card.mask
+
+    def remove(self, card):
+        super().remove(card)
+        self._forget(card)
+
+    def pop(self, index=-1):
+        card = super().pop(index)
+        self._forget(card)
+        return card
+
+    def clear(self):
+        super().clear()
+        self.mask = 0
+
+    def __iadd__(self, cards):
+        self.extend(cards)
+        return self
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._update_mask()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._update_mask()
+
+
+class CountedHand(MaskHand):
+    """A MaskHand that also keeps counts of its cards by suit and rank.
+
+    The attributes 'suit_counts' (indexed by Card.suit_id), 'rank_counts'
+    (indexed by Card.rank_id), 'card_counts' (indexed by Card.id) and
+    'qa_count' (number of Qs and As) are kept up to date by all list
+    operations, so strategies can look them up instead of scanning the hand.
+    """
+    def _update_mask(self):
+        """Recompute the mask and counts from the cards in the hand."""
+        super()._update_mask()
+        self.card_counts = [0] * len(DECK)
+        self.suit_counts = [0] * len(Card.suits)
+        self.rank_counts = [0] * len(Card.values)
+        self.qa_count = 0
+        for card in self:
+            self._count(card, 1)
+
+    def _count(self, card, change):
+        """Change the counts of a card, its suit and its rank."""
+        self.card_counts[card.id] += change
+        self.suit_counts[card.suit_id] += change
+        self.rank_counts[card.rank_id] += change
+        if card.rank_id in QA_RANKS:
+            self.qa_count += change
+
+    def append(self, card):
+        super().append(card)
+        self._count(card, 1)
+
+    def insert(self, index, card):
+        super().insert(index, card)
+        self._count(card, 1)
+
+    def _forget(self, card):
+        """Uncount a removed card and clear its bit if it was the last copy."""
+        self._count(card, -1)
+        if not self.card_counts[card.id]:
+            self.mask ^= card.mask
+
+    def clear(self):
+        super().clear()
+        self._update_mask()
+
+
+class Hand:
+    """A hand of cards bucketed by suit and rank.
+
+    Unlike MaskHand, a Hand is not a list: it keeps the number of copies
+    of every card, the counts of every suit and rank and a 52-bit mask, whose
+    runs of 13 bits are the suit buckets. Adding and removing a card are O(1),
+    and the cards matching a card's suit or value, plus all Qs and As, are
+    found with a single AND instead of scanning the hand.
+
+    A Hand supports iteration, len, truthiness and membership, and hand[-1]
+    is the card added last, e.g. the card just drawn, as long as the hand
+    holds it. Other indices, slices
+    and iteration list the cards ordered by id with the last added card at
+    the end, which takes O(n). The attributes 'mask', 'card_counts',
+    'suit_counts', 'rank_counts' and 'qa_count' match those of CountedHand,
+    so strategies can use either.
+    """
+    __slots__ = ('mask', 'card_counts', 'suit_counts', 'rank_counts', 'qa_count', 'size', 'last')
+
+    def __init__(self, cards=()):
+        self.clear()
+        for card in cards:
+            self.append(card)
+
+    def append(self, card):
+        """Add a card to the hand."""
+        self.card_counts[card.id] += 1
+        self.suit_counts[card.suit_id] += 1
+        self.rank_counts[card.rank_id] += 1
+        if card.mask & QA_MASK:
+            self.qa_count += 1
+        self.mask |= card.mask
+        self.size += 1
+        self.last = card
+
+    def remove(self, card):
+        """Remove a copy of a card from the hand.
+
+        Raises ValueError if the hand does not hold the card.
+        """
+        counts = self.card_counts
+        if not counts[card.id]:
+            raise ValueError(f"{card} is not in hand")
+        counts[card.id] -= 1
+        self.suit_counts[card.suit_id] -= 1
+        self.rank_counts[card.rank_id] -= 1
+        if card.mask & QA_MASK:
+            self.qa_count -= 1
+        if not counts[card.id]:
+            self.mask ^= card.mask
+            if card is self.last:
+                self.last = None
+        self.size -= 1
+
+    def clear(self):
+        """Remove all cards from the hand."""
+        self.mask = 0
+        self.card_counts = [0] * len(DECK)
+        self.suit_counts = [0] * len(Card.suits)
+        self.rank_counts = [0] * len(Card.values)
+        self.qa_count = 0
+        self.size = 0
+        self.last = None
+
+    def matching(self, card):
+        """Return the cards matching a card's suit or value and all Qs and As, ordered by id.
+
+        Every card is listed once, however many copies the hand holds.
+        """
+        return cards_in_mask(self.mask & (SUIT_MASKS[card.suit_id] | RANK_MASKS[card.rank_id] | QA_MASK))
+
+    def of_suit(self, suit_id):
+        """Return the cards of a suit, ordered by id and listed once each."""
+        return cards_in_mask(self.mask & SUIT_MASKS[suit_id])
+
+    def cards(self):
+        """Return a list of the cards, ordered by id with the last added card at the end."""
+        counts = self.card_counts
+        cards = []
+        for card in cards_in_mask(self.mask):
+            cards += [card] * counts[card.id]
+        last = self.last
+        if last is not None and cards[-1] is not last:
+            cards.remove(last)
+            cards.append(last)
+        return cards
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
+
+    def __contains__(self, card):
+        return self.card_counts[card.id] > 0
+
+    def __iter__(self):
+        return iter(self.cards())
+
+    def __getitem__(self, index):
+        if index == -1 and self.last is not None:
+            return self.last
+        return self.cards()[index]
+
+    def __setitem__(self, index, cards):
+        """Replace all cards of the hand, as in hand[:] = cards."""
+        if index != slice(None):
+            raise TypeError("only all cards of a hand can be replaced, as in hand[:] = cards")
+        self.clear()
+        for card in cards:
+            self.append(card)
+
+    def __eq__(self, other):
+        """Return whether two hands hold the same cards, in any order."""
+        if isinstance(other, Hand):
+            return self.card_counts == other.card_counts
+        if isinstance(other, (list, tuple)):
+            return self.card_counts == Hand(other).card_counts
+        return NotImplemented
 
-def generate_deck():
-    return [Card(suit, value)
-            for suit in Card.suits for value in Card.values]
+    def __repr__(self):
+        return f"Hand({self.cards()})"
@@ -0,0 +1,141 @@
+"""Compact state of idle tables of the switch game.
+
+A server that keeps many tables resident spends most of their memory on
+objects rather than on cards: every hand holds count lists, every list a
+pointer per card. A CompactTable keeps the state of a table in a few flat
+arrays instead. The cards of all hands, the stock and the discards are one
+array of card ids, one byte each, which are turned back into the interned
+Card objects of cards.DECK when the table is resumed. Player names are
+interned strings, and tables with the same limits share one limits tuple.
+
+    table = compact(game)       # park an idle table
+    game = table.restore(Switch())
+"""
+import sys
+from array import array
+
+from cards import DECK
+from players import player_classes
+from records import PLAYER_TYPES
+from switch import GameState
+
+
+# Seat types are stored with the codes of game records, their position in PLAYER_TYPES.
+_TYPE_CODES = {player_classes[typ]: code for code, typ in enumerate(PLAYER_TYPES)}
+
+# Bits of the flags of a CompactTable.
+SKIP = 1
+DRAW2 = 2
+DRAW4 = 4
+
+# Limits tuples by value, so that tables with the same limits share one tuple.
+_limits = {}
+
+
+def share_limits(limits):
+    """Return the shared tuple equal to a limits tuple."""
+    return _limits.setdefault(limits, limits)
+
+
+class CompactTable:
+    """The state of a table of Switch in flat arrays.
+
+    The attributes are:
+
+    types - bytes, the player_classes code of every seat, see PLAYER_TYPES;
+    names - tuple of the interned names of the players;
+    cards - array of the card ids of all hands in seat order, then the stock
+        and then the discards, with the top cards last;
+    sizes - array of the hand sizes by seat followed by the size of the stock;
+    flags - int, the bits SKIP, DRAW2 and DRAW4;
+    direction, current, turns - as in Switch;
+    limits - tuple of the decks, hand_size, max_players, max_turns and max_repetitions of the game.
+
+    Players are recreated from their player_classes key with default settings
+    when the table is restored, and states seen before the table was compacted
+    no longer count towards a repetition draw.
+    """
+    __slots__ = ('types', 'names', 'cards', 'sizes', 'flags', 'direction', 'current', 'turns', 'limits')
+
+    def __init__(self, types, names, cards, sizes, flags=0, direction=1, current=0, turns=0, limits=None):
+        self.types = types
+        self.names = names
+        self.cards = cards
+        self.sizes = sizes
+        self.flags = flags
+        self.direction = direction
+        self.current = current
+        self.turns = turns
+        self.limits = limits
+
+    def state(self):
+        """Return the GameState of the table."""
+        cards = [DECK[card_id] for card_id in self.cards]
+        hands = []
+        start = 0
+        for size in self.sizes:
+            hands.append(tuple(cards[start:start + size]))
+            start += size
+        stock = hands.pop()
+        flags = self.flags
+        return GameState(tuple(hands), stock, tuple(cards[start:]), bool(flags & SKIP), bool(flags & DRAW2),
+                         bool(flags & DRAW4), self.direction, self.current)
+
+    def restore(self, game):
+        """Seat new players of the table's types in a game and restore the state of the table.
+
+        Parameters:
+        game - Switch game, e.g. a HeadlessSwitch, whose limits, players and round are replaced.
+
+        Returns the game.
+        """
+        if self.limits is not None:
+            (game.decks, game.hand_size, game.max_players, game.max_turns, game.max_repetitions) = self.limits
+        game.players = [player_classes[PLAYER_TYPES[code]](name) for code, name in zip(self.types, self.names)]
+        for player in game.players:
+            if hasattr(player, 'game'):
+                player.game = game
+        game.stock = []
+        game.discards = []
+        game.restore(self.state())
+        game.turns = self.turns
+        return game
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactTable):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"CompactTable(names={self.names!r}, cards={len(self.cards)}, current={self.current})"
+
+
+def player_type(player):
+    """Return the player_classes code of a player.
+
+    Raises ValueError if the player's class is not in player_classes.
+    """
+    try:
+        return _TYPE_CODES[type(player)]
+    except KeyError:
+        raise ValueError(f"Only players of player_classes can be compacted: {type(player).__name__}") from None
+
+
+def compact(game):
+    """Return the CompactTable of the state of a Switch game.
+
+    Raises ValueError if a player's class is not in player_classes.
+    """
+    players = game.players
+    types = bytes(player_type(player) for player in players)
+    names = tuple(sys.intern(player.name) for player in players)
+    cards = array('B')
+    for player in players:
+        cards.extend([card.id for card in player.hand])
+    cards.extend([card.id for card in game.stock])
+    cards.extend([card.id for card in game.discards])
+    sizes = array('H', [len(player.hand) for player in players])
+    sizes.append(len(game.stock))
+    flags = game.skip * SKIP | game.draw2 * DRAW2 | game.draw4 * DRAW4
+    limits = share_limits((game.decks, game.hand_size, game.max_players, game.max_turns, game.max_repetitions))
+    return CompactTable(types, names, cards, sizes, flags, game.direction, game.current, game.turns, limits)
@@ -0,0 +1,219 @@
+"""Exact search of the endgame of a round of switch.
+
+When all hands are small, every way the round can go on is searched. The
+solver sees all cards, like a double dummy analysis in bridge: the hands of
+all players and the order of the stock are known, so the result is the exact
+outcome of the round with best play by every player. This makes it a
+ground truth for evaluating the heuristics of the AI players, and EndgameAI
+plays with it by solving positions in which the hidden cards are dealt at random.
+
+Every player maximizes their own chance of winning (max^n search). Positions
+are stored in a transposition table keyed by a canonical form of the state:
+the hands as bitmasks, the number of cards left in the stock, the top card,
+the seat to move, the direction and the flags. Which cards of the stock are
+left follows from their number, since cards are only drawn from its top. The
+table holds at most max_entries positions and evicts the least recently
+used ones. Lines that reshuffle the discards or that are not decided within
+max_depth turns are scored as draws, and solutions that depend on them are
+marked as inexact.
+"""
+from collections import OrderedDict, namedtuple
+
+from cards import DECK, cards_in_mask
+from switch import PLAYABLE_MASKS
+
+
+# A move of a whole turn: the card discarded from the hand, or None to draw;
+# whether a drawn card is discarded; and the seat swapped with after a J, or None.
+Move = namedtuple('Move', ['card', 'discard_drawn', 'target'])
+
+# Result of a search: the chance of winning of every seat, the best move of
+# the player to move (None if they cannot choose) and whether the values are exact.
+Solution = namedtuple('Solution', ['values', 'move', 'exact'])
+
+_RANK_8, _RANK_2, _RANK_Q, _RANK_K, _RANK_J = (DECK[0].values.index(value) for value in '82QKJ')
+
+
+class Reshuffle(Exception):
+    """Raised when a line of play needs the discards to be shuffled back into the stock."""
+
+
+class EndgameSolver:
+    """Solver of switch positions in which all hands hold at most max_hand cards.
+
+    Keyword arguments:
+    max_hand - largest hand size of a position that is solved (default 2);
+    max_depth - number of turns searched before a line is scored as a draw (default 10);
+    max_entries - number of positions the transposition table holds (default 100000).
+
+    The table is kept between searches, so positions of the same round are
+    solved faster. The attributes 'nodes', 'hits' and 'evictions' count the
+    searched positions, transposition table hits and evicted positions.
+    """
+    def __init__(self, max_hand=2, max_depth=10, max_entries=100000):
+        self.max_hand = max_hand
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self.table = OrderedDict()
+        self.stock = ()
+        self.nodes = self.hits = self.evictions = 0
+
+    def applies(self, state):
+        """Return whether all hands of a GameState hold at most max_hand cards and the round has a single deck."""
+        hands = state.hands
+        return (all(len(hand) <= self.max_hand for hand in hands)
+                and sum(map(len, hands)) + len(state.stock) + len(state.discards) <= len(DECK))
+
+    def solve(self, state):
+        """Solve a GameState at the start of the turn of the current player.
+
+        A state taken when the player is asked to select a card, after any
+        penalties have been applied, is solved in the same way.
+        Returns a Solution. Raises ValueError if a card appears more than once.
+        """
+        values, move, exact = self.search(self.position(state), self.max_depth)
+        return Solution(values, move, exact)
+
+    def move_values(self, state):
+        """Return a list of (move, values, exact) tuples of every move of the player to move in a GameState."""
+        position = self.position(state)
+        count = len(position[0])
+        return [(move, *self.child_values(child, count, self.max_depth - 1)) for move, child in self.moves(position)]
+
+    def position(self, state):
+        """Return the search position of a GameState.
+
+        Raises ValueError if a card appears more than once.
+        """
+        cards = [card for hand in state.hands for card in hand] + list(state.stock) + list(state.discards)
+        if len(set(cards)) != len(cards):
+            raise ValueError("The endgame solver only solves rounds played with a single deck")
+        if state.stock != self.stock:
+            # The stock is part of every key implicitly, so positions of another stock are dropped.
+            self.table.clear()
+            self.stock = state.stock
+        hands = tuple(sum(card.mask for card in hand) for hand in state.hands)
+        return (hands, len(state.stock), len(state.discards), state.discards[-1].id, state.current,
+                state.direction, state.skip, state.draw2, state.draw4)
+
+    def search(self, position, depth):
+        """Return the values, best move and exactness of a position searched to a depth in turns."""
+        hands, stock, discards, top, seat, direction, skip, draw2, draw4 = position
+        count = len(hands)
+        if depth == 0:
+            return (1.0 / count,) * count, None, False
+        # The number of discards follows from the other fields, so it is not part of the key.
+        key = (hands, stock, top, seat, direction, skip, draw2, draw4)
+        entry = self.table.get(key)
+        if entry is not None and (entry[3] or entry[0] >= depth):
+            self.table.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2], entry[3]
+        self.nodes += 1
+
+        best = best_move = None
+        exact = True
+        for move, child in self.moves(position):
+            values, child_exact = self.child_values(child, count, depth - 1)
+            exact = exact and child_exact
+            if best is None or values[seat] > best[seat]:
+                best, best_move = values, move
+                if values[seat] == 1.0:
+                    break
+
+        self.table[key] = (depth, best, best_move, exact)
+        if len(self.table) > self.max_entries:
+            self.table.popitem(last=False)
+            self.evictions += 1
+        return best, best_move, exact
+
+    def child_values(self, child, count, depth):
+        """Return the values and exactness of the outcome of a move, see moves."""
+        if child is None:
+            # The line needs a reshuffle, whose outcome is left to chance.
+            return (1.0 / count,) * count, False
+        if isinstance(child, int):
+            return tuple(1.0 if idx == child else 0.0 for idx in range(count)), True
+        values, _, exact = self.search(child, depth)
+        return values, exact
+
+    def moves(self, position):
+        """Generate the moves of the player to move and the positions they lead to.
+
+        A position is replaced by the winning seat if the move wins the
+        round, and by None if it needs a reshuffle. A skipped player has the
+        single move None.
+        """
+        hands, stock, discards, top, seat, direction, skip, draw2, draw4 = position
+        if skip:
+            yield None, (hands, stock, discards, top, (seat + direction) % len(hands), direction, False, draw2, draw4)
+            return
+        hand = hands[seat]
+        try:
+            if draw2:
+                hand, stock = self.pick_up(hand, stock, discards, 2)
+            if draw4:
+                hand, stock = self.pick_up(hand, stock, discards, 4)
+        except Reshuffle:
+            yield None, None
+            return
+        start = (hands, hand, stock, discards, top, seat, direction)
+
+        for card in cards_in_mask(hand & PLAYABLE_MASKS[top]):
+            yield from self.discard(start, hand ^ card.mask, stock, card, Move(card, False, None))
+
+        # Draw a card instead, which may be discarded if it matches.
+        try:
+            drawn, stock = self.pick_up(hand, stock, discards, 1)
+        except Reshuffle:
+            yield Move(None, False, None), None
+            return
+        if drawn != hand:
+            card = DECK[(drawn ^ hand).bit_length() - 1]
+            if card.mask & PLAYABLE_MASKS[top]:
+                yield from self.discard(start, hand, stock, card, Move(None, True, None))
+        yield Move(None, False, None), self.next_position(start, drawn, stock, top, direction)
+
+    def pick_up(self, hand, stock, discards, amount):
+        """Return a hand and the number of cards left in the stock after drawing cards.
+
+        Raises Reshuffle if the stock runs out while there are discards to shuffle back.
+        """
+        for _ in range(amount):
+            if not stock:
+                if discards == 1:
+                    break
+                raise Reshuffle()
+            stock -= 1
+            hand |= self.stock[stock].mask
+        return hand, stock
+
+    def discard(self, start, hand, stock, card, move):
+        """Generate the moves and positions of discarding a card, which has left the hand."""
+        hands, _, _, discards, _, seat, direction = start
+        if not hand:
+            yield move, seat
+            return
+        rank = card.rank_id
+        skip = rank == _RANK_8
+        draw2 = rank == _RANK_2
+        draw4 = rank == _RANK_Q
+        if rank == _RANK_K:
+            direction = -direction
+        if rank != _RANK_J:
+            yield move, self.next_position(start, hand, stock, card.id, direction, discards + 1, skip, draw2, draw4)
+            return
+        for target in range(len(hands)):
+            if target != seat:
+                swapped = list(hands)
+                swapped[seat], swapped[target] = hands[target], hand
+                yield move._replace(target=target), (tuple(swapped), stock, discards + 1, card.id,
+                                                     (seat + direction) % len(hands), direction, False, False, False)
+
+    @staticmethod
+    def next_position(start, hand, stock, top, direction, discards=None, skip=False, draw2=False, draw4=False):
+        """Return the position after the turn of the player to move, whose hand is now hand."""
+        hands, _, _, old_discards, _, seat, _ = start
+        hands = hands[:seat] + (hand,) + hands[seat+1:]
+        discards = old_discards if discards is None else discards
+        return hands, stock, discards, top, (seat + direction) % len(hands), direction, skip, draw2, draw4
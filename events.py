@@ -0,0 +1,74 @@
+"""Events of the switch game and their delivery to subscribers."""
+from collections import namedtuple
+
+
+# A round starts with a shuffled deck, given as a tuple of cards with the top of the stock last.
+RoundStarted = namedtuple('RoundStarted', ['deck'])
+# A player's turn starts; index is the player's 1-based seat and direction is 1 or -1.
+TurnStarted = namedtuple('TurnStarted', ['player', 'index', 'top_card', 'direction'])
+# A player is skipped because of an 8.
+PlayerSkipped = namedtuple('PlayerSkipped', ['player'])
+# A player draws penalty cards because of a 2 or a Q.
+CardsDrawn = namedtuple('CardsDrawn', ['player', 'amount'])
+# A player draws from stock, either voluntarily or because nothing could be discarded.
+DrawingCard = namedtuple('DrawingCard', ['player', 'voluntary'])
+# A player discards a card.
+CardDiscarded = namedtuple('CardDiscarded', ['player', 'card'])
+# A player keeps a drawn card that could have been discarded.
+CardKept = namedtuple('CardKept', ['player', 'card'])
+# A drawn card cannot be discarded.
+DiscardRefused = namedtuple('DiscardRefused', ['player', 'card'])
+# The direction of the game reverses because of a K.
+DirectionReversed = namedtuple('DirectionReversed', ['direction'])
+# Two players swap hands because of a J.
+HandsSwapped = namedtuple('HandsSwapped', ['player_1', 'player_2'])
+# The discards are shuffled back into the stock, given as a tuple of cards with the top of the stock last.
+Reshuffled = namedtuple('Reshuffled', ['stock'])
+# No more cards can be drawn.
+StockExhausted = namedtuple('StockExhausted', [])
+# A player wins the round.
+Won = namedtuple('Won', ['player'])
+# The round ends without a winner; reason is switch.TURN_CAP or switch.REPETITION.
+Drawn = namedtuple('Drawn', ['reason'])
+
+
+class EventBus:
+    """Delivers game events to subscribers.
+
+    Subscribers are callables that take a single event. A bus without
+    subscribers is falsy, so that emitters can skip creating events nobody receives:
+
+        if bus:
+            bus.emit(Won(player))
+    """
+    def __init__(self, *subscribers):
+        self.subscribers = list(subscribers)
+
+    def __bool__(self):
+        return bool(self.subscribers)
+
+    def subscribe(self, subscriber):
+        """Add a subscriber to the bus."""
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber from the bus."""
+        self.subscribers.remove(subscriber)
+
+    def emit(self, event):
+        """Deliver an event to all subscribers."""
+        for subscriber in self.subscribers:
+            subscriber(event)
+
+
+class NullEventBus(EventBus):
+    """An event bus that never has subscribers.
+
+    Emitters guarded by the truthiness of the bus skip all event creation,
+    so a game with a NullEventBus does no work for events at all.
+    """
+    def subscribe(self, subscriber):
+        raise TypeError("NullEventBus does not accept subscribers")
+
+    def emit(self, event):
+        pass
@@ -0,0 +1,124 @@
+"""Load test of the switch server with many concurrent bot connections.
+
+Start a server and connect 500 bots to it with
+
+    $ python3 server.py &
+    $ python3 loadtest.py --bots 500
+
+or test a server running in the same process with
+
+    $ python3 loadtest.py --bots 500 --local
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import namedtuple
+
+from server import DEFAULT_HOST, DEFAULT_PORT, SwitchServer
+
+
+# Statistics of a load test: the numbers of bots, finished rounds and failed connections,
+# the number of prompts answered, the latencies of the answers in seconds and the elapsed seconds.
+LoadTestResult = namedtuple('LoadTestResult', ['bots', 'rounds', 'failures', 'prompts', 'latencies', 'elapsed'])
+
+PROMPTS = ('CARD', 'PLAYER', 'OPTION')
+
+
+async def run_bot(name, connect, latencies):
+    """Play a round as a bot that answers every prompt at random.
+
+    Parameters:
+    name - name of the bot;
+    connect - coroutine function that opens a connection to the server;
+    latencies - list to which the time between an answer and the next line is appended.
+
+    Returns True if the bot saw the end of the round.
+    """
+    reader, writer = await connect()
+    answered = None
+    won = False
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if answered is not None:
+                latencies.append(time.perf_counter() - answered)
+                answered = None
+            keyword, _, text = line.decode().partition(' ')
+            if keyword == 'WELCOME':
+                writer.write(f"{name}\n".encode())
+            elif keyword in PROMPTS:
+                options = int(text.split(':')[0])
+                writer.write(f"{random.randint(1, options)}\n".encode())
+                answered = time.perf_counter()
+            elif keyword in ('WON', 'DRAWN'):
+                won = True
+            await writer.drain()
+    finally:
+        writer.close()
+    return won
+
+
+async def load_test(bots, connect):
+    """Connect bots to a server concurrently and play a round with each.
+
+    Parameters:
+    bots - number of concurrent bot connections;
+    connect - coroutine function that opens a connection to the server.
+
+    Returns a LoadTestResult.
+    """
+    latencies = []
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_bot(f"bot {i + 1}", connect, latencies) for i in range(bots)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    rounds = sum(1 for result in results if result is True)
+    failures = sum(1 for result in results if isinstance(result, Exception))
+    return LoadTestResult(bots, rounds, failures, len(latencies), latencies, elapsed)
+
+
+async def local_load_test(bots, humans=1, ais=('smart', 'smart')):
+    """Run a load test against a SwitchServer on a free port of this process.
+
+    Returns a LoadTestResult.
+    """
+    server = await SwitchServer(humans, ais).start(DEFAULT_HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        return await load_test(bots, lambda: asyncio.open_connection(DEFAULT_HOST, port))
+
+
+def main():
+    """Run a load test from the command line and print its statistics."""
+    parser = argparse.ArgumentParser(description="Load test the switch server with concurrent bots.")
+    parser.add_argument('-n', '--bots', type=int, default=200, help="number of concurrent bot connections")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="TCP host of the server")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="TCP port of the server")
+    parser.add_argument('--unix', metavar='PATH', help="connect to a Unix socket instead of TCP")
+    parser.add_argument('--local', action='store_true', help="test a server running in this process")
+    args = parser.parse_args()
+
+    if args.local:
+        result = asyncio.run(local_load_test(args.bots))
+    elif args.unix:
+        result = asyncio.run(load_test(args.bots, lambda: asyncio.open_unix_connection(args.unix)))
+    else:
+        result = asyncio.run(load_test(args.bots, lambda: asyncio.open_connection(args.host, args.port)))
+
+    print(f"Bots:            {result.bots}")
+    print(f"Rounds finished: {result.rounds}")
+    print(f"Failures:        {result.failures}")
+    print(f"Elapsed:         {result.elapsed:.2f} s")
+    print(f"Prompts:         {result.prompts} ({result.prompts / result.elapsed:.0f}/sec)")
+    if len(result.latencies) > 1:
+        latencies = sorted(result.latencies)
+        p99 = latencies[int(len(latencies) * 0.99)]
+        print(f"Latency:         median {statistics.median(latencies) * 1e3:.2f} ms, p99 {p99 * 1e3:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""Monte Carlo rollouts for the decisions of MonteCarloAI.
+
+A decision is evaluated by dealing the cards the deciding player cannot see
+at random, making each of the possible moves and playing the round on with
+SmartAI policies for all players. The move that wins most rollouts is best.
+Rollouts are played in batches, either in this process or spread across a pool
+of worker processes, until enough have been played or the time budget is spent.
+"""
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from players import SmartAI
+from simulation import HeadlessSwitch
+
+
+# Kinds of decisions and the moves they choose from.
+CARD = 'card'       # a card to discard, or False to draw from stock instead
+OPTION = 'option'   # True to discard the drawn card (the last card in hand), False to keep it
+SWAP = 'swap'       # the seat of the player to swap hands with
+
+# Rollouts not won within this many turns score as a draw.
+MAX_TURNS = 500
+# Number of determinizations per task.
+BATCH_SIZE = 8
+
+# Rollout games of this process by number of players, and worker pools by number of workers.
+_games = {}
+_pools = {}
+
+
+def determinize(state, seat, rng):
+    """Return a GameState in which the cards a player cannot see are dealt at random.
+
+    Parameters:
+    state - GameState of the round;
+    seat - index of the player;
+    rng - random.Random used for dealing.
+
+    The cards in the other players' hands and in the stock are shuffled together
+    and dealt back in the same amounts, so the player's own hand, the discards
+    and the sizes of all hands stay as they are.
+    """
+    hidden = [card for idx, hand in enumerate(state.hands) if idx != seat for card in hand]
+    hidden += state.stock
+    rng.shuffle(hidden)
+    hands = []
+    start = 0
+    for idx, hand in enumerate(state.hands):
+        if idx == seat:
+            hands.append(hand)
+        else:
+            hands.append(tuple(hidden[start:start + len(hand)]))
+            start += len(hand)
+    return state._replace(hands=tuple(hands), stock=tuple(hidden[start:]))
+
+
+def rollout_game(players):
+    """Return the rollout game of this process for a number of players.
+
+    All seats of a rollout game are taken by SmartAI players holding Hands.
+    The game and its players share one random.Random, which is seeded for every rollout.
+    """
+    game = _games.get(players)
+    if game is None:
+        rng = random.Random()
+        game = _games[players] = HeadlessSwitch((SmartAI(f"rollout {idx + 1}", rng) for idx in range(players)), rng)
+    return game
+
+
+def play_move(game, seat, kind, move):
+    """Make a move for a player of a rollout game and play the round on.
+
+    Parameters:
+    game - HeadlessSwitch restored to the state of the decision;
+    seat - index of the deciding player;
+    kind - CARD, OPTION or SWAP;
+    move - the move to make.
+
+    Returns the score of the player: 1 for a win, 0 for a loss and
+    1 / number of players if the round was not won within MAX_TURNS.
+    """
+    player = game.players[seat]
+    if kind == CARD:
+        if move:
+            game.discard_card(player, move)
+        else:
+            game.draw_and_discard(player)
+    elif kind == OPTION:
+        if move:
+            game.discard_card(player, player.hand[-1])
+    else:
+        game.swap_hands(player, game.players[move])
+    if not player.hand:
+        return 1.0
+    # The deciding player's turn is over, the round goes on with the next player.
+    game.current = seat
+    game.advance()
+    game.turns = 0
+    result = game.play(MAX_TURNS)
+    if result is None or result.winner is None:
+        return 1.0 / len(game.players)
+    return 1.0 if result.winner == seat else 0.0
+
+
+def rollout_batch(state, seat, kind, moves, count, seed):
+    """Play rollouts of every move from a number of determinizations of a state.
+
+    Every move is played from the same determinizations and with the same
+    random numbers (common random numbers), so differences between the scores
+    of the moves are due to the moves rather than to luck.
+
+    Returns a list of the total scores of the moves.
+    """
+    rng = random.Random(seed)
+    game = rollout_game(len(state.hands))
+    totals = [0.0] * len(moves)
+    for _ in range(count):
+        sample = determinize(state, seat, rng)
+        rollout_seed = rng.getrandbits(64)
+        for idx, move in enumerate(moves):
+            game.rng.seed(rollout_seed)
+            game.restore(sample)
+            totals[idx] += play_move(game, seat, kind, move)
+    return totals
+
+
+def worker_pool(workers):
+    """Return a process pool with a number of workers, shared by all decisions."""
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = _pools[workers] = ProcessPoolExecutor(workers)
+    return pool
+
+
+def evaluate(state, seat, kind, moves, rollouts=32, time_budget=None, workers=1, rng=random):
+    """Return the mean rollout scores of the moves of a decision.
+
+    Parameters:
+    state - GameState of the round at the decision;
+    seat - index of the deciding player;
+    kind - CARD, OPTION or SWAP;
+    moves - list of the moves to choose from.
+
+    Keyword arguments:
+    rollouts - maximum number of rollouts of each move (default 32);
+    time_budget - seconds after which no more rollouts are started, or None for no limit (default None);
+    workers - number of worker processes, None for one per core, 1 plays the rollouts in this process (default 1);
+    rng - random.Random or the random module from which the batches are seeded (default random).
+
+    The seeds of all batches are drawn from rng up front, so without a time
+    budget the scores only depend on its state, not on the number of workers.
+    At least one batch is always played.
+    """
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    sizes = [BATCH_SIZE] * (rollouts // BATCH_SIZE)
+    if rollouts % BATCH_SIZE or not sizes:
+        sizes.append(rollouts % BATCH_SIZE or 1)
+    tasks = [(state, seat, kind, moves, size, rng.getrandbits(64)) for size in sizes]
+
+    totals = [0.0] * len(moves)
+    played = 0
+    if workers == 1:
+        for task in tasks:
+            for idx, total in enumerate(rollout_batch(*task)):
+                totals[idx] += total
+            played += task[4]
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+    else:
+        pool = worker_pool(workers or os.cpu_count())
+        futures = {pool.submit(rollout_batch, *task): task[4] for task in tasks}
+        pending = set(futures)
+        while pending:
+            # Wait for the first batch regardless of the time budget.
+            timeout = None
+            if deadline is not None and played:
+                timeout = max(0.0, deadline - time.perf_counter())
+            done, pending = wait(pending, timeout, FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                for idx, total in enumerate(future.result()):
+                    totals[idx] += total
+                played += futures[future]
+        # Batches that have not started when the time is up are dropped.
+        for future in pending:
+            future.cancel()
+    return [total / played for total in totals]
@@ -1,10 +1,14 @@
 """Players for the switch game."""
+import json
 import random
 import user_interface as ui
 
+from cards import CountedHand, Hand
+
 
 class Player:
     """Player class for a human player."""
+    __slots__ = ('name', 'hand')
     is_ai = False
 
     def __init__(self, name):
@@ -40,13 +44,16 @@ class Player:
 class SimpleAI:
     """Simple computer strategy.
 
-    This AI player performs random decisions.
+    This AI player performs random decisions. They are drawn from
+    self.rng, a random.Random or by default the global random module.
     """
+    __slots__ = ('name', 'hand', 'rng')
     is_ai = True
 
-    def __init__(self, name):
+    def __init__(self, name, rng=None):
         self.name = name
-        self.hand = []
+        self.hand = Hand()
+        self.rng = random if rng is None else rng
 
     def select_card(self, choices, _):
         """Select a card to be discarded.
@@ -57,7 +64,7 @@ class SimpleAI:
         # Card choices are duplicated to decrease the probability of not discarding any cards.
         choices = choices * 2
         choices.append("No discard")
-        choice = random.choice(choices)
+        choice = self.rng.choice(choices)
         if choice == "No discard":
             return False
         else:
@@ -68,7 +75,7 @@ class SimpleAI:
 
         Randomly chooses one of the players.
         """
-        return random.choice(others)
+        return self.rng.choice(others)
 
     def select_card_option(self, card, others):
         """Select an option of what to do with
@@ -76,49 +83,95 @@ class SimpleAI:
 
         Randomly chooses one of the options.
         """
-        discard_card = random.choice([True, False])
+        discard_card = self.rng.choice([True, False])
         return discard_card
 
 
+# Weights of the SmartAI strategy. Tuned weights can be loaded with load_weights.
+DEFAULT_WEIGHTS = {
+    # Scores of discarding a card, see SmartAI.select_card.
+    'swap': 3,              # J, per card held more than the smallest other hand, minus one
+    'draw4': 6,             # Q
+    'draw2': 4,             # 2
+    'skip': 2,              # 8
+    'reverse': 3,           # K, if the previous player holds more cards than the next
+    'reverse_other': -1,    # K, otherwise
+    'any': -2,              # A
+    'suit': 1,              # per other card in hand of the card's suit
+    'threshold': -2,        # the best card is only discarded if its score is higher
+    # Rules of SmartAI.select_card_option, which keep a drawn card if their weight is positive.
+    'keep_qa': 1,           # keep a Q or A if the hand holds none
+    'keep_new_suit': 1,     # keep a card of a suit the hand does not hold
+    'keep_j': 1,            # keep a J if the player's hand is the smallest
+}
+
+
+def load_weights(path):
+    """Load SmartAI weights from a JSON file, such as one written by tuning.py.
+
+    Weights missing from the file keep their default value.
+    Raises ValueError if the file holds unknown weights.
+    """
+    with open(path) as file:
+        weights = json.load(file)
+    unknown = set(weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown SmartAI weights in {path}: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_WEIGHTS, **weights}
+
+
 class SmartAI(SimpleAI):
     """Smart computer strategy.
 
     This AI player makes choices based on the
-    current game state.
+    current game state, scored with self.weights
+    (by default DEFAULT_WEIGHTS).
     """
+    __slots__ = ('weights',)
+
+    def __init__(self, name, rng=None, weights=None):
+        super().__init__(name, rng)
+        self.weights = DEFAULT_WEIGHTS if weights is None else {**DEFAULT_WEIGHTS, **weights}
+
     def select_card(self, choices, hands):
         """Select a card to be discarded.
 
         Selects a card that either harms opponents or
         chooses a suit that the player holds the most cards of.
         """
+        hand = count_hand(self.hand)
+        suit_counts = hand.suit_counts
+        mask = hand.mask
+        weights = self.weights
+        suit_weight = weights['suit']
+        # Offsets of the card values, which don't depend on the card.
+        swap_score = weights['swap']*(hands[0]-1-min(hands[1:]))
+        offsets = {'Q': weights['draw4'], '2': weights['draw2'], '8': weights['skip'],
+                   'K': weights['reverse'] if hands[-1] > hands[1] else weights['reverse_other'], 'A': weights['any']}
+
         def score(card):
-            in_suit = len([c for c in self.hand
-                           if c.suit == card.suit and c is not card])
-
-            offset = {
-                'J': 3*(hands[0]-1-min(hands[1:])),
-                'Q': 6 + in_suit,
-                '2': 4 + in_suit,
-                '8': 2 + in_suit,
-                'K': (3 if hands[-1] > hands[1] else -1) + in_suit,
-                'A': -2 + in_suit,
-            }
-
-            return offset.get(card.value, in_suit)
-        sorted_choices = sorted(choices, key=score, reverse=True)
-        candidate = sorted_choices[0]
-        if score(candidate) > -2:
-            return candidate if score(candidate) > -2 else None
+            if card.value == 'J':
+                return swap_score
+            # Number of other cards in hand with the same suit.
+            in_suit = suit_counts[card.suit_id] - (1 if mask & card.mask else 0)
+            return offsets.get(card.value, 0) + suit_weight*in_suit
+
+        # The first of the best scoring choices is selected.
+        scores = [score(card) for card in choices]
+        best = max(scores)
+        if best > weights['threshold']:
+            return choices[scores.index(best)]
+        return None
 
     def ask_for_swap(self, others):
         """Select a player to swap hands with.
 
         Switch hands with the player who holds the least cards.
         """
-        smallest = min(len(p.hand) for p in others)
-        best = [p for p in others if len(p.hand) == smallest]
-        return random.choice(best)
+        sizes = hand_sizes(others)
+        smallest = min(sizes)
+        best = [others[idx] for idx, size in enumerate(sizes) if size == smallest]
+        return self.rng.choice(best)
 
     def select_card_option(self, card, others):
         """Select an option of what to do with
@@ -127,27 +180,33 @@ class SmartAI(SimpleAI):
         Choose to add card to hand if it would be useful in the future
         or harm the player, otherwise discard.
         """
-        # Variables that help determining whether to discard or not.
-        same_suit = len([c for c in self.hand if c.suit == card.suit and c is not card])
-        different_suits = {c.suit for c in self.hand if c is not card}
-        qa_in_hand = len([c for c in self.hand if c.value in 'QA' and c is not card])
-        smallest = min(len(p.hand) for p in others)
+        # Variables that help determining whether to discard or not, not counting the card itself.
+        hand = count_hand(self.hand)
+        held = 1 if hand.mask & card.mask else 0
+        suit_counts = list(hand.suit_counts)
+        suit_counts[card.suit_id] -= held
+        same_suit = suit_counts[card.suit_id]
+        different_suits = [count for count in suit_counts if count]
+        qa_in_hand = hand.qa_count - (held if card.value in 'QA' else 0)
+        smallest = min(hand_sizes(others))
+        weights = self.weights
+        keep_j = weights['keep_j'] > 0
 
         # If the player has more than 1 card in hand,
         if len(self.hand) >= 2:
             # If the player doesn't have some card suit in hand,
             if len(different_suits) < 4:
                 # If card's value is Q or A and player has no Q or A in hand, add it to hand.
-                if card.value in 'QA' and qa_in_hand == 0:
+                if card.value in 'QA' and qa_in_hand == 0 and weights['keep_qa'] > 0:
                     return False
                 # If player doesn't have cards with drawn card's suit in hand, add it to hand.
-                elif same_suit == 0:
+                elif same_suit == 0 and weights['keep_new_suit'] > 0:
                     return False
                 # Otherwise discard.
                 else:
                     return True
             # If the drawn card is a J and the player's hand is the smallest, add it to hand.
-            elif card.value == 'J' and len(self.hand) < smallest:
+            elif card.value == 'J' and keep_j and len(self.hand) < smallest:
                 return False
             # Otherwise discard.
             else:
@@ -155,7 +214,7 @@ class SmartAI(SimpleAI):
         # If the drawn card is a J,
         elif card.value == 'J':
             # If the player's hand is the smallest, add it to hand.
-            if len(self.hand) < smallest:
+            if keep_j and len(self.hand) < smallest:
                 return False
             # Otherwise discard.
             else:
@@ -165,8 +224,205 @@ class SmartAI(SimpleAI):
             return True
 
 
+class MonteCarloAI(SmartAI):
+    """Monte Carlo computer strategy.
+
+    This AI player tries out each of its choices in rollouts: it deals
+    the cards it cannot see at random, makes the choice and plays the round
+    on with SmartAI policies. The choice that wins most rollouts is selected.
+
+    Switch.setup_round tells the player which game it is seated in;
+    without a game it plays like SmartAI.
+    """
+    __slots__ = ('game', 'rollouts', 'time_budget', 'workers')
+
+    def __init__(self, name, rng=None, rollouts=32, time_budget=0.1, workers=1):
+        """Create a player.
+
+        Keyword arguments:
+        rng - random.Random from which the rollouts are seeded (default: the random module);
+        rollouts - maximum number of rollouts of each choice (default 32);
+        time_budget - seconds per decision after which no more rollouts are started,
+            or None for no limit (default 0.1);
+        workers - number of worker processes for the rollouts, None for one per core,
+            1 plays them in this process (default 1).
+        """
+        super().__init__(name, rng)
+        self.game = None
+        self.rollouts = rollouts
+        self.time_budget = time_budget
+        self.workers = workers
+
+    def select_card(self, choices, hands):
+        """Select a card to be discarded, or False to draw from stock instead."""
+        if self.game is None:
+            return super().select_card(choices, hands)
+        return self.best_move('card', list(choices) + [False])
+
+    def ask_for_swap(self, others):
+        """Select a player to swap hands with."""
+        if self.game is None or len(others) == 1:
+            return super().ask_for_swap(others)
+        seats = [self.game.players.index(p) for p in others]
+        return self.game.players[self.best_move('swap', seats)]
+
+    def select_card_option(self, card, others):
+        """Select whether to discard a card that was drawn after nothing was discarded."""
+        if self.game is None:
+            return super().select_card_option(card, others)
+        return self.best_move('option', [True, False])
+
+    def best_move(self, kind, moves):
+        """Return the first of the moves with the best rollout score.
+
+        Parameters:
+        kind - kind of the decision, see montecarlo.evaluate;
+        moves - list of the moves to choose from.
+        """
+        # The rollouts are played by the game engine, which imports this module.
+        from montecarlo import evaluate
+        seat = self.game.players.index(self)
+        scores = evaluate(self.game.snapshot(), seat, kind, moves,
+                          self.rollouts, self.time_budget, self.workers, self.rng)
+        return moves[scores.index(max(scores))]
+
+
+class EndgameAI(SmartAI):
+    """Endgame computer strategy.
+
+    This AI player plays like SmartAI until all hands hold at most max_hand
+    cards. Then it deals the cards it cannot see at random a number of times,
+    solves every deal exactly with endgame.EndgameSolver and makes the choice
+    with the highest chance of winning across the deals.
+
+    Switch.setup_round tells the player which game it is seated in;
+    without a game it plays like SmartAI.
+    """
+    __slots__ = ('game', 'max_hand', 'max_depth', 'samples', 'solver', 'drew_j')
+
+    def __init__(self, name, rng=None, weights=None, max_hand=2, max_depth=10, samples=8):
+        """Create a player.
+
+        Keyword arguments:
+        weights - SmartAI weights used before the endgame (default DEFAULT_WEIGHTS);
+        max_hand - largest hand size of a solved position (default 2);
+        max_depth - number of turns searched, see endgame.EndgameSolver (default 10);
+        samples - number of deals of the hidden cards solved per decision (default 8).
+        """
+        super().__init__(name, rng, weights)
+        self.game = None
+        self.max_hand = max_hand
+        self.max_depth = max_depth
+        self.samples = samples
+        self.solver = None
+        # Whether a J being discarded was drawn this turn rather than selected from the hand.
+        self.drew_j = False
+
+    def select_card(self, choices, hands):
+        """Select a card to be discarded, or False to draw from stock instead."""
+        self.drew_j = False
+        choice = self.endgame_choice(lambda state, seat: state, lambda move: (move.card,))
+        if choice is None:
+            return super().select_card(choices, hands)
+        return choice[0] or False
+
+    def ask_for_swap(self, others):
+        """Select a player to swap hands with."""
+        def undo_discard(state, seat):
+            # The turn is solved again from its start, with the J back in the hand or on the stock.
+            jack = state.discards[-1]
+            state = state._replace(discards=state.discards[:-1])
+            if self.drew_j:
+                return state._replace(stock=state.stock + (jack,))
+            hands = list(state.hands)
+            hands[seat] += (jack,)
+            return state._replace(hands=tuple(hands))
+
+        def target(move):
+            if self.drew_j:
+                return (move.target,) if move.card is None and move.discard_drawn else None
+            return (move.target,) if move.card is not None and move.card.value == 'J' else None
+
+        choice = self.endgame_choice(undo_discard, target)
+        if choice is None:
+            return super().ask_for_swap(others)
+        return self.game.players[choice[0]]
+
+    def select_card_option(self, card, others):
+        """Select whether to discard a card that was drawn after nothing was discarded."""
+        def undraw(state, seat):
+            # The drawn card is put back on the stock, so the turn is solved from its start.
+            hands = list(state.hands)
+            hand = list(hands[seat])
+            hand.remove(card)
+            hands[seat] = tuple(hand)
+            return state._replace(hands=tuple(hands), stock=state.stock + (card,))
+
+        choice = self.endgame_choice(undraw, lambda move: (move.discard_drawn,) if move.card is None else None)
+        discard = super().select_card_option(card, others) if choice is None else choice[0]
+        self.drew_j = discard and card.value == 'J'
+        return discard
+
+    def endgame_choice(self, rewind, choice_of):
+        """Return a 1-tuple of the choice that wins most often in the endgame, or None if it is not the endgame yet.
+
+        Parameters:
+        rewind - function of a dealt GameState and the player's seat that returns
+            the state at the start of the player's turn;
+        choice_of - function of an endgame.Move that returns a 1-tuple of the
+            choice the move makes, or None if the move does not fit the decision.
+        """
+        if self.game is None:
+            return None
+        # The solver and the deals are provided by modules that import this one.
+        from endgame import EndgameSolver
+        from montecarlo import determinize
+        if self.solver is None:
+            self.solver = EndgameSolver(self.max_hand, self.max_depth)
+        state = self.game.snapshot()
+        if not self.solver.applies(state):
+            return None
+        seat = self.game.players.index(self)
+        totals = {}
+        for _ in range(self.samples):
+            # The best line of every choice counts, as later choices are made knowing more.
+            best = {}
+            for move, values, _ in self.solver.move_values(rewind(determinize(state, seat, self.rng), seat)):
+                choice = choice_of(move)
+                if choice is not None:
+                    best[choice] = max(best.get(choice, 0.0), values[seat])
+            for choice, value in best.items():
+                totals[choice] = totals.get(choice, 0.0) + value
+        if not totals:
+            return None
+        return max(totals, key=totals.get)
+
+
+def hand_sizes(others):
+    """Return the sizes of the hands of other players, in the order of others.
+
+    Games offer the other players as a switch.OtherPlayers view, which looks
+    the sizes up instead of counting every hand; the hands of other sequences
+    of players are counted.
+    """
+    if hasattr(others, 'hand_sizes'):
+        return others.hand_sizes()
+    return [len(p.hand) for p in others]
+
+
+def count_hand(hand):
+    """Return a hand that keeps counts of its cards, i.e. a Hand or a CountedHand.
+
+    Hands of AI players keep counts already and are returned as they are,
+    other hands are counted once.
+    """
+    return hand if isinstance(hand, (Hand, CountedHand)) else CountedHand(hand)
+
+
 player_classes = {
     'human': Player,
     'simple': SimpleAI,
     'smart': SmartAI,
+    'montecarlo': MonteCarloAI,
+    'endgame': EndgameAI,
 }
@@ -0,0 +1,124 @@
+"""Opt-in per-phase profiling of turns of the switch game."""
+import time
+
+
+class TurnProfiler:
+    """Collects timings of the phases of turns and counters of game effects.
+
+    A TurnProfiler attached to a game replaces the phase methods of that game
+    object (not of its class) with timed wrappers, and detaching restores them.
+    Games without an attached profiler run their methods unchanged, so
+    profiling costs nothing while it is disabled.
+
+        with TurnProfiler(game) as profiler:
+            game.run_round()
+        print(profiler.summary())
+
+    Timings are inclusive: the time of a phase includes the time of the
+    phases it calls, e.g. draw_and_discard includes pick_up_card.
+    """
+    # Timed methods of Switch, in the order they are reported.
+    PHASES = (
+        'run_player',
+        'apply_penalties',
+        'get_discardable_cards',
+        'ask_for_card',
+        'discard_card',
+        'draw_and_discard',
+        'ask_for_card_option',
+        'pick_up_card',
+        'shuffle',
+        'swap_hands',
+    )
+    COUNTERS = ('skips', 'reshuffles', 'all cards distributed', 'swaps')
+
+    def __init__(self, game=None):
+        self.game = None
+        self.reset()
+        if game is not None:
+            self.attach(game)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detach()
+
+    def reset(self):
+        """Clear all collected timings and counters."""
+        self.seconds = dict.fromkeys(self.PHASES, 0.0)
+        self.calls = dict.fromkeys(self.PHASES, 0)
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self._picking = 0
+
+    def attach(self, game):
+        """Start profiling a game.
+
+        Returns the profiler.
+        """
+        if self.game is not None:
+            raise ValueError("TurnProfiler is already attached to a game")
+        self.game = game
+        for name in self.PHASES:
+            setattr(game, name, self._timed(name, getattr(game, name)))
+        return self
+
+    def detach(self):
+        """Stop profiling and restore the methods of the game, if one is attached."""
+        if self.game is None:
+            return
+        for name in self.PHASES:
+            delattr(self.game, name)
+        self.game = None
+
+    def _timed(self, name, method):
+        """Return a wrapper of a method that times its calls and updates counters."""
+        seconds, calls, counters = self.seconds, self.calls, self.counters
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            if name == 'pick_up_card':
+                self._picking += 1
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                seconds[name] += perf_counter() - start
+                calls[name] += 1
+                if name == 'pick_up_card':
+                    self._picking -= 1
+            # Update counters of game effects from the calls and their results.
+            if name == 'apply_penalties' and result:
+                counters['skips'] += 1
+            elif name == 'shuffle' and self._picking:
+                counters['reshuffles'] += 1
+            elif name == 'pick_up_card':
+                amount = args[1] if len(args) > 1 else kwargs.get('amount', 1)
+                if result < amount:
+                    counters['all cards distributed'] += 1
+            elif name == 'swap_hands':
+                counters['swaps'] += 1
+            return result
+        return timed
+
+    def stats(self):
+        """Return the collected timings and counters as a dict.
+
+        The dict has the keys 'phases', a dict of {'calls': int, 'seconds': float}
+        by phase name, and 'counters', a dict of counts by counter name.
+        """
+        phases = {name: {'calls': self.calls[name], 'seconds': self.seconds[name]} for name in self.PHASES}
+        return {'phases': phases, 'counters': dict(self.counters)}
+
+    def summary(self):
+        """Return a printable summary of the collected timings and counters."""
+        total = self.seconds['run_player'] or 1.0
+        lines = [f"{'phase':24} {'calls':>10} {'total ms':>10} {'mean µs':>10} {'% turn':>8}"]
+        for name in self.PHASES:
+            calls, seconds = self.calls[name], self.seconds[name]
+            mean = seconds / calls * 1e6 if calls else 0.0
+            lines.append(f"{name:24} {calls:10d} {seconds * 1e3:10.2f} {mean:10.2f} {seconds / total:8.1%}")
+        lines.append('')
+        for name, count in self.counters.items():
+            lines.append(f"{name:24} {count:10d}")
+        return '\n'.join(lines)
@@ -0,0 +1,369 @@
+"""Compact binary records of games of switch.
+
+A record file starts with the 5 byte header b'SWGR' followed by the format
+version, and then holds any number of game records. Each game record is:
+
+    u32 length of the rest of the record
+    u64 seed
+    u16 number of cards in the deck d
+    u16 number of seats n, followed by n bytes of seat type codes
+    d bytes of card ids, the shuffled deck with the top of the stock last
+    actions until the end of the record
+
+Each action is a code byte followed by an argument byte, except for the
+actions of SEAT_ACTIONS, whose argument is the u16 index of a seat, and
+RESHUFFLE, which is followed by the u16 number of cards n in the new stock
+and their n card ids.
+All integers are little-endian.
+"""
+import mmap
+import struct
+from array import array
+from collections import deque, namedtuple
+
+import events
+from cards import DECK
+from events import EventBus, NullEventBus
+from players import player_classes
+from seeding import seed_game
+from switch import REPETITION, TURN_CAP, Switch
+
+
+MAGIC = b'SWGR'
+VERSION = 3
+HEADER = MAGIC + bytes([VERSION])
+RECORD_HEADER = struct.Struct('<IQHH')
+U16 = struct.Struct('<H')
+
+# Seat types are stored as their position in player_classes.
+PLAYER_TYPES = list(player_classes)
+
+# Action codes and their arguments.
+TURN = 0            # seat of the player whose turn starts
+SKIPPED = 1         # seat of the skipped player
+PENALTY = 2         # number of penalty cards drawn
+PLAY = 3            # id of the card discarded from hand
+DRAW = 4            # 1 if the player chose not to discard, 0 if nothing could be discarded
+DISCARD_DRAWN = 5   # id of the drawn card that was discarded
+KEEP = 6            # id of the drawn card that was kept
+REFUSED = 7         # id of the drawn card that cannot be discarded
+REVERSED = 8        # 1 for clockwise, 0 for anti-clockwise direction after a K
+SWAP = 9            # seat of the player whose hand is swapped with
+RESHUFFLE = 10      # number of cards in the new stock, followed by their ids
+EXHAUSTED = 11      # 0, no more cards to draw
+WON = 12            # seat of the winner
+DRAWN = 13          # 0 if the round was drawn at the turn cap, 1 if because of a repeated state
+
+# Actions whose argument is a u16 seat index, as tables can seat more than 255 players.
+SEAT_ACTIONS = (TURN, SKIPPED, SWAP, WON)
+
+# Arguments of DRAWN by reason.
+DRAW_REASONS = (TURN_CAP, REPETITION)
+
+# A game record read from a file.
+GameRecord = namedtuple('GameRecord', ['seed', 'seats', 'deck', 'actions'])
+
+
+class GameRecorder:
+    """An event subscriber that records the actions of a game.
+
+    Subscribe a GameRecorder to the event bus of a Switch game; once a round
+    has finished, record(seed) returns the GameRecord of the round.
+    """
+    def __init__(self, game):
+        self.game = game
+        self.deck = b''
+        self.actions = bytearray()
+        self.drawing = False
+
+    def __call__(self, event):
+        typ = type(event)
+        actions = self.actions
+        if typ is events.RoundStarted:
+            self.deck = bytes(card.id for card in event.deck)
+            actions.clear()
+        elif typ is events.TurnStarted:
+            self.seat_action(TURN, event.index - 1)
+            self.drawing = False
+        elif typ is events.PlayerSkipped:
+            self.seat_action(SKIPPED, self.game.players.index(event.player))
+        elif typ is events.CardsDrawn:
+            actions += bytes((PENALTY, event.amount))
+        elif typ is events.DrawingCard:
+            actions += bytes((DRAW, event.voluntary))
+            self.drawing = True
+        elif typ is events.CardDiscarded:
+            actions += bytes((DISCARD_DRAWN if self.drawing else PLAY, event.card.id))
+        elif typ is events.CardKept:
+            actions += bytes((KEEP, event.card.id))
+        elif typ is events.DiscardRefused:
+            actions += bytes((REFUSED, event.card.id))
+        elif typ is events.DirectionReversed:
+            actions += bytes((REVERSED, event.direction == 1))
+        elif typ is events.HandsSwapped:
+            self.seat_action(SWAP, self.game.players.index(event.player_2))
+        elif typ is events.Reshuffled:
+            actions.append(RESHUFFLE)
+            actions += U16.pack(len(event.stock))
+            actions += bytes(card.id for card in event.stock)
+        elif typ is events.StockExhausted:
+            actions += bytes((EXHAUSTED, 0))
+        elif typ is events.Won:
+            self.seat_action(WON, self.game.players.index(event.player))
+        elif typ is events.Drawn:
+            actions += bytes((DRAWN, DRAW_REASONS.index(event.reason)))
+
+    def seat_action(self, code, seat):
+        """Record an action of SEAT_ACTIONS with the index of a seat."""
+        self.actions.append(code)
+        self.actions += U16.pack(seat)
+
+    def record(self, seed, seats):
+        """Return the GameRecord of the last round.
+
+        Parameters:
+        seed - seed of the round;
+        seats - sequence of player_classes keys of the players.
+        """
+        return GameRecord(seed, tuple(seats), self.deck, bytes(self.actions))
+
+
+def iter_actions(actions):
+    """Iterate over the (code, argument) pairs of a record's actions.
+
+    The argument of RESHUFFLE is the tuple of card ids of the new stock.
+    """
+    i = 0
+    while i < len(actions):
+        code = actions[i]
+        if code in SEAT_ACTIONS:
+            arg = U16.unpack_from(actions, i + 1)[0]
+            i += 1 + U16.size
+        elif code == RESHUFFLE:
+            count = U16.unpack_from(actions, i + 1)[0]
+            i += 1 + U16.size
+            arg, i = tuple(actions[i:i+count]), i + count
+        else:
+            arg = actions[i+1]
+            i += 2
+        yield code, arg
+
+
+def count_turns(record):
+    """Return the number of turns of a recorded game."""
+    return sum(1 for code, _ in iter_actions(record.actions) if code in (TURN, SKIPPED))
+
+
+class RecordWriter:
+    """Appends game records to a record file.
+
+    Records are written as they are added, so a RecordWriter can archive any
+    number of games without keeping them in memory. Use as a context manager:
+
+        with RecordWriter(path) as writer:
+            writer.write(record)
+    """
+    def __init__(self, path):
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, record):
+        """Append a GameRecord to the file."""
+        seat_codes = bytes(PLAYER_TYPES.index(typ) for typ in record.seats)
+        length = RECORD_HEADER.size - 4 + len(seat_codes) + len(record.deck) + len(record.actions)
+        self.file.write(RECORD_HEADER.pack(length, record.seed, len(record.deck), len(seat_codes)))
+        self.file.write(seat_codes)
+        self.file.write(record.deck)
+        self.file.write(record.actions)
+
+    def close(self):
+        """Close the record file."""
+        self.file.close()
+
+
+class RecordReader:
+    """Reads game records from a memory-mapped record file.
+
+    Records can be iterated over or accessed by index. Only the offsets of
+    the records are held in memory; record data is read from the mapped file on demand.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(HEADER)] != HEADER:
+            raise ValueError(f"Not a switch record file of version {VERSION}: {path}")
+        self.offsets = array('Q')
+        offset = len(HEADER)
+        while offset < len(self.map):
+            self.offsets.append(offset)
+            offset += 4 + struct.unpack_from('<I', self.map, offset)[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        offset = self.offsets[index]
+        length, seed, size, count = RECORD_HEADER.unpack_from(self.map, offset)
+        start = offset + RECORD_HEADER.size
+        seats = tuple(PLAYER_TYPES[code] for code in self.map[start:start+count])
+        start += count
+        deck = self.map[start:start+size]
+        actions = self.map[start+size:offset+4+length]
+        return GameRecord(seed, seats, deck, actions)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        """Unmap the record file."""
+        self.map.close()
+
+
+class ReplayPlayer:
+    """A player that repeats the decisions of a recorded game."""
+    __slots__ = ('game', 'name', 'hand')
+    is_ai = True
+
+    def __init__(self, game, name):
+        self.game = game
+        self.name = name
+        self.hand = []
+
+    def select_card(self, choices, _):
+        """Return the recorded card choice."""
+        return self.game.next_decision(PLAY)
+
+    def ask_for_swap(self, others):
+        """Return the recorded player to swap hands with."""
+        return self.game.players[self.game.next_decision(SWAP)]
+
+    def select_card_option(self, card, others):
+        """Return the recorded decision whether to discard a drawn card."""
+        return self.game.next_decision(DISCARD_DRAWN)
+
+
+class ReplaySwitch(Switch):
+    """A Switch game that replays a GameRecord.
+
+    The game is set up with the recorded deck and its players repeat the
+    recorded decisions, so after any number of turns the game state equals
+    the state of the recorded game after the same number of turns.
+    A drawn game is replayed up to the turn at which it was drawn. The game
+    has as many decks as the recorded deck and seats all recorded players.
+    """
+    __slots__ = ('decisions',)
+
+    def __init__(self, record):
+        drawn = any(code == DRAWN for code, _ in iter_actions(record.actions))
+        super().__init__(NullEventBus(), decks=len(record.deck) // len(DECK), max_players=len(record.seats),
+                         max_turns=count_turns(record) if drawn else None, max_repetitions=None)
+        self.players = [ReplayPlayer(self, f"{typ} {idx + 1}") for idx, typ in enumerate(record.seats)]
+        self.decisions = deque(self._decisions(record))
+        self.setup_round()
+
+    @staticmethod
+    def _decisions(record):
+        """Yield the (kind, value) decisions of a record in the order they are asked for."""
+        yield RESHUFFLE, tuple(record.deck)
+        for code, arg in iter_actions(record.actions):
+            if code == PLAY:
+                yield PLAY, DECK[arg]
+            elif code == DRAW and arg:
+                # The player was asked for a card and chose not to discard.
+                yield PLAY, False
+            elif code == DISCARD_DRAWN:
+                yield DISCARD_DRAWN, True
+            elif code == KEEP:
+                yield DISCARD_DRAWN, False
+            elif code in (SWAP, RESHUFFLE):
+                yield code, arg
+
+    def next_decision(self, kind):
+        """Return the next recorded decision, which must be of the given kind."""
+        recorded, value = self.decisions.popleft()
+        if recorded != kind:
+            raise ValueError(f"Record does not match game: expected action {kind}, found {recorded}")
+        return value
+
+    def shuffle(self, cards):
+        """Put the cards in their recorded order."""
+        cards[:] = [DECK[i] for i in self.next_decision(RESHUFFLE)]
+
+    def replay(self, turns=None):
+        """Replay turns of the recorded game.
+
+        Keyword arguments:
+        turns - number of turns to replay, or None to replay until the game is won or drawn (default None).
+
+        Returns the index of the winner, or None if the game has not been won.
+        """
+        while (turns is None or turns > 0) and not self.draw_reason():
+            player = self.players[self.current]
+            self.run_player(player)
+            self.turns += 1
+            if turns is not None:
+                turns -= 1
+            if not player.hand:
+                return self.current
+            self.advance()
+        return None
+
+
+def replay(record, turns=None):
+    """Return a ReplaySwitch with the state of a recorded game after some turns.
+
+    Parameters:
+    record - GameRecord to replay.
+
+    Keyword arguments:
+    turns - number of turns to replay, or None to replay the whole game (default None).
+    """
+    game = ReplaySwitch(record)
+    game.replay(turns)
+    return game
+
+
+def record_game(seats, seed):
+    """Play a round between AI players and return the GameRecord of it.
+
+    Parameters:
+    seats - sequence of player_classes keys of AI players;
+    seed - int seed of the random streams of the round, see seeding.seed_game.
+    """
+    game = Switch(EventBus())
+    recorder = GameRecorder(game)
+    game.events.subscribe(recorder)
+    game.players = [player_classes[typ](f"{typ} {idx + 1}") for idx, typ in enumerate(seats)]
+    seed_game(game, seed)
+    game.run_round()
+    return recorder.record(seed, seats)
+
+
+def record_games(path, seats, games, master_seed=0):
+    """Play AI-only rounds and append their records to a record file.
+
+    Parameters:
+    path - path of the record file;
+    seats - sequence of player_classes keys of AI players;
+    games - number of rounds to play.
+
+    Keyword arguments:
+    master_seed - the seed of game i is (master_seed << 32) + i (default 0).
+    """
+    with RecordWriter(path) as writer:
+        for index in range(games):
+            writer.write(record_game(seats, (master_seed << 32) + index))
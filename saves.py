@@ -0,0 +1,193 @@
+"""Binary saves of in-progress tables of the switch game.
+
+A table is saved as the packed bytes of its compact.CompactTable:
+
+    u32 length of the rest of the table
+    u16 number of seats n
+    u8  flags (bits compact.SKIP, DRAW2 and DRAW4)
+    i8  direction
+    u16 current seat index
+    u32 turns
+    u16 decks, u16 hand_size, u16 max_players
+    u32 max_turns, u16 max_repetitions (all bits set for None)
+    u16 size of the stock
+    u16 number of cards
+    n bytes of seat type codes, the positions of the types in player_classes
+    n u16 hand sizes
+    n names, each a u8 length followed by the UTF-8 name
+    card ids of the hands in seat order, the stock and the discards, top cards last
+
+A save file starts with the 5 byte header b'SWTB' followed by the format
+version, then holds any number of tables and ends with an index: the u64
+offsets of the tables, the u64 number of tables and the u64 offset of the
+index. Tables are read by index without reading the tables before them.
+All integers are little-endian.
+"""
+import mmap
+import struct
+import sys
+from array import array
+
+from compact import CompactTable, compact, share_limits
+
+MAGIC = b'SWTB'
+VERSION = 1
+HEADER = MAGIC + bytes([VERSION])
+TABLE_HEADER = struct.Struct('<IHBbHIHHHIHHH')
+FOOTER = struct.Struct('<QQ')
+
+# Stored in place of a max_turns or max_repetitions of None.
+NO_LIMIT_32 = 0xFFFFFFFF
+NO_LIMIT_16 = 0xFFFF
+
+_swap = sys.byteorder != 'little'
+
+
+def pack(table):
+    """Return the bytes of a CompactTable.
+
+    Raises ValueError if a player's name is longer than 255 bytes.
+    """
+    names = [name.encode() for name in table.names]
+    if any(len(name) > 255 for name in names):
+        raise ValueError("Names of saved players are at most 255 bytes long")
+    names = b''.join(bytes((len(name),)) + name for name in names)
+    sizes = table.sizes
+    if _swap:
+        sizes = array('H', sizes)
+        sizes.byteswap()
+    seats = len(table.types)
+    decks, hand_size, max_players, max_turns, max_repetitions = table.limits
+    length = TABLE_HEADER.size - 4 + seats + 2 * seats + len(names) + len(table.cards)
+    header = TABLE_HEADER.pack(length, seats, table.flags, table.direction, table.current, table.turns,
+                               decks, hand_size, max_players,
+                               NO_LIMIT_32 if max_turns is None else max_turns,
+                               NO_LIMIT_16 if max_repetitions is None else max_repetitions,
+                               sizes[seats], len(table.cards))
+    return b''.join((header, table.types, sizes[:seats].tobytes(), names, table.cards.tobytes()))
+
+
+def unpack(data, offset=0):
+    """Return the CompactTable packed in data, a bytes-like object, at an offset."""
+    (_, seats, flags, direction, current, turns, decks, hand_size, max_players, max_turns, max_repetitions,
+     stock, count) = TABLE_HEADER.unpack_from(data, offset)
+    start = offset + TABLE_HEADER.size
+    types = bytes(data[start:start + seats])
+    start += seats
+    sizes = array('H', data[start:start + 2 * seats])
+    if _swap:
+        sizes.byteswap()
+    sizes.append(stock)
+    start += 2 * seats
+    names = []
+    for _ in range(seats):
+        end = start + 1 + data[start]
+        names.append(sys.intern(str(data[start + 1:end], 'utf-8')))
+        start = end
+    cards = array('B', data[start:start + count])
+    limits = share_limits((decks, hand_size, max_players, None if max_turns == NO_LIMIT_32 else max_turns,
+                           None if max_repetitions == NO_LIMIT_16 else max_repetitions))
+    return CompactTable(types, tuple(names), cards, sizes, flags, direction, current, turns, limits)
+
+
+def save_table(game):
+    """Return the bytes of the state of a Switch game.
+
+    Raises ValueError if a player's class is not in player_classes.
+    """
+    return pack(compact(game))
+
+
+def load_table(data, game):
+    """Restore a table saved by save_table into a Switch game and return the game."""
+    return unpack(data).restore(game)
+
+
+class TableWriter:
+    """Writes tables to a new save file.
+
+    The index is written when the writer is closed. Use as a context manager:
+
+        with TableWriter(path) as writer:
+            for game in games:
+                writer.write(game)
+    """
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(HEADER)
+        self.offsets = array('Q')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, table):
+        """Append a Switch game or a CompactTable to the file."""
+        if not isinstance(table, CompactTable):
+            table = compact(table)
+        self.offsets.append(self.file.tell())
+        self.file.write(pack(table))
+
+    def close(self):
+        """Write the index and close the save file."""
+        if self.file.closed:
+            return
+        index = self.file.tell()
+        offsets = self.offsets
+        if _swap:
+            offsets = array('Q', offsets)
+            offsets.byteswap()
+        self.file.write(offsets.tobytes())
+        self.file.write(FOOTER.pack(len(self.offsets), index))
+        self.file.close()
+
+
+class TableReader:
+    """Reads tables from a memory-mapped save file.
+
+    Tables can be iterated over or accessed by index as CompactTables.
+    The offsets are read from the index at the end of the file, so opening
+    a file does not read its tables.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(HEADER)] != HEADER:
+            raise ValueError(f"Not a switch save file of version {VERSION}: {path}")
+        count, index = FOOTER.unpack_from(self.map, len(self.map) - FOOTER.size)
+        self.offsets = array('Q', self.map[index:index + 8 * count])
+        if _swap:
+            self.offsets.byteswap()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        return unpack(self.map, self.offsets[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def load(self, index, game):
+        """Restore the table with an index into a Switch game and return the game."""
+        return self[index].restore(game)
+
+    def close(self):
+        """Unmap the save file."""
+        self.map.close()
+
+
+def save_tables(path, games):
+    """Write Switch games or CompactTables to a new save file."""
+    with TableWriter(path) as writer:
+        for game in games:
+            writer.write(game)
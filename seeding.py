@@ -0,0 +1,38 @@
+"""Deterministic random streams for reproducible games of switch.
+
+Games and players draw their random numbers from their own `rng`, a
+random.Random or the random module itself. Streams are split off a seed by
+a path of keys, so the stream of any game of a sharded run can be recreated
+from the master seed alone, in any process and in any order:
+
+    game.players = create_players(seats)
+    seed_game(game, stream_seed(master_seed, index))
+    game.run_round()
+"""
+import random
+
+
+def stream_seed(seed, *keys):
+    """Return the seed of the stream split off a seed by a path of keys.
+
+    The seed is a string, e.g. stream_seed(7, 12) == '7:12', which random.Random
+    hashes into its state, so the streams of different paths are independent.
+    """
+    return ':'.join(str(key) for key in (seed,) + keys)
+
+
+def stream(seed, *keys):
+    """Return a random.Random for the stream split off a seed by a path of keys."""
+    return random.Random(stream_seed(seed, *keys))
+
+
+def seed_game(game, seed):
+    """Give a game and each of its players their own stream split off a seed.
+
+    The game shuffles with the stream 'deck' and the player in seat i
+    decides with the stream 'seat', i, so the decisions of a player do not
+    change the cards dealt and vice versa.
+    """
+    game.rng = stream(seed, 'deck')
+    for seat, player in enumerate(game.players):
+        player.rng = stream(seed, 'seat', seat)
@@ -0,0 +1,428 @@
+"""Asyncio server hosting many concurrent tables of the switch game.
+
+Human players connect over TCP or a Unix socket and play with a line-based
+text protocol, so a table can be joined with e.g. `nc localhost 8765`. The
+server sends lines starting with a keyword:
+
+    WELCOME <text>       the server asks for the player's name
+    INFO <text>          something happened at the table
+    HAND <cards>         the player's hand at the start of their turn
+    CARD <n>: <options>  select a card to discard, or n for no discard
+    PLAYER <n>: <options> select a player to swap hands with
+    OPTION <n>: <options> select what to do with a drawn card
+    RETRY <text>         the answer was invalid, answer the last prompt again
+    WON <name>           the round is over
+    DRAWN <reason>       the round is over without a winner
+
+Prompts (CARD, PLAYER and OPTION) are answered with a line holding an
+integer in [1-n]. Every table runs as its own task and yields to the event
+loop after every turn, so AI turns of one table never stall the other tables.
+"""
+import argparse
+import asyncio
+import inspect
+
+import user_interface as ui
+from events import (EventBus, TurnStarted, PlayerSkipped, CardsDrawn, DrawingCard, CardDiscarded, CardKept,
+                    DiscardRefused, DirectionReversed, HandsSwapped, Reshuffled, StockExhausted, Won, Drawn)
+from players import SmartAI, player_classes
+from switch import MAX_PLAYERS, Switch
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Connections that may wait to be accepted, enough for hundreds of players connecting at once.
+BACKLOG = 1024
+# AI players that may take seats. They decide in microseconds; the searches of
+# 'montecarlo' and 'endgame' would stall every table of the event loop.
+AI_TYPES = ('simple', 'smart')
+
+
+async def resolve(decision):
+    """Return a decision, awaiting it first if it is awaitable."""
+    if inspect.isawaitable(decision):
+        return await decision
+    return decision
+
+
+class Connection:
+    """A line-based text connection to a remote player."""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.finished = asyncio.Event()
+
+    @property
+    def closed(self):
+        return self.writer.is_closing()
+
+    def send(self, line):
+        """Send a line to the player, unless the connection is closed."""
+        if not self.closed:
+            self.writer.write(line.encode() + b'\n')
+
+    async def get_int_input(self, min_val, max_val):
+        """Get int input from the player.
+
+        Async counterpart of user_interface.get_int_input.
+        Raises ConnectionError if the player disconnects.
+        """
+        await self.writer.drain()
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionError("Player disconnected")
+            choice = ui.convert_to_int(line.decode(errors='replace').strip())
+            if min_val <= choice <= max_val:
+                return choice
+            self.send(f"RETRY Input should be an integer between [{min_val:d}-{max_val:d}]")
+            await self.writer.drain()
+
+    async def get_string_input(self):
+        """Get string input from the player, or an empty string if they disconnect."""
+        await self.writer.drain()
+        line = await self.reader.readline()
+        return line.decode(errors='replace').strip()
+
+    async def close(self):
+        """Close the connection."""
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        self.finished.set()
+
+
+async def select_card(connection, cards):
+    """Select a card from the hand or choose not to discard.
+
+    Async counterpart of user_interface.select_card.
+    """
+    options = [f"{i + 1} - {card}" for i, card in enumerate(cards)]
+    options.append(f"{len(cards) + 1} - No discard")
+    connection.send(f"CARD {len(cards) + 1}: " + ", ".join(options))
+    choice = await connection.get_int_input(1, len(cards) + 1)
+    if choice == len(cards) + 1:
+        return False
+    return cards[choice - 1]
+
+
+async def select_player(connection, players):
+    """Select another player.
+
+    Async counterpart of user_interface.select_player.
+    """
+    options = [f"{idx + 1} - {player.name} = {len(player.hand):d}" for idx, player in enumerate(players)]
+    connection.send(f"PLAYER {len(players)}: " + ", ".join(options))
+    choice = await connection.get_int_input(1, len(players))
+    return players[choice - 1]
+
+
+async def select_discard_choice(connection, card):
+    """Select what to do with the card drawn when nothing was discarded.
+
+    Async counterpart of user_interface.select_discard_choice.
+    Returns True if the card is to be discarded.
+    """
+    connection.send(f"OPTION 2: 1 - Discard {card}, 2 - Add to hand")
+    return await connection.get_int_input(1, 2) == 1
+
+
+class RemotePlayer(SmartAI):
+    """A human player connected to the server.
+
+    Decisions are asked for over the player's connection. If the player
+    disconnects, the SmartAI strategy plays their seat for the rest of the round.
+    """
+    __slots__ = ('connection',)
+    is_ai = False
+
+    def __init__(self, name, connection):
+        super().__init__(name)
+        self.connection = connection
+
+    async def ask(self, select, *args):
+        """Return the player's answer to a prompt, or None if they are disconnected."""
+        if self.connection.closed:
+            return None
+        try:
+            return await select(self.connection, *args)
+        except ConnectionError:
+            self.connection.writer.close()
+            return None
+
+    async def select_card(self, choices, hands):
+        """Select a card to be discarded, or False to draw from stock instead."""
+        choice = await self.ask(select_card, choices)
+        return super().select_card(choices, hands) if choice is None else choice
+
+    async def ask_for_swap(self, others):
+        """Select a player to swap hands with."""
+        choice = await self.ask(select_player, others)
+        return super().ask_for_swap(others) if choice is None else choice
+
+    async def select_card_option(self, card, others):
+        """Select whether to discard a card that was drawn after nothing was discarded."""
+        choice = await self.ask(select_discard_choice, card)
+        return super().select_card_option(card, others) if choice is None else choice
+
+
+class AsyncSwitch(Switch):
+    """A Switch game whose turns are coroutines, so that many tables can share an event loop.
+
+    Player decisions may be coroutines, like those of RemotePlayer, or plain
+    methods, like those of the AI players. The game yields to the event loop
+    after every turn, and all players are asked about drawn cards with the
+    other players as for AIs.
+    """
+    __slots__ = ()
+
+    async def run_round(self):
+        """Run a single round of Switch.
+
+        Returns the winner of the round, or None if the round was drawn.
+        """
+        self.setup_round()
+        while True:
+            reason = self.draw_reason()
+            if reason:
+                if self.events:
+                    self.events.emit(Drawn(reason))
+                return None
+            player = self.players[self.current]
+            self.turns += 1
+            await self.run_player(player)
+            if not player.hand:
+                if self.events:
+                    self.events.emit(Won(player))
+                return player
+            self.advance()
+            # Let other tables play before the next turn.
+            await asyncio.sleep(0)
+
+    async def run_player(self, player):
+        """Process a single player's turn.
+
+        Parameters:
+        player - Player to make the turn.
+
+        Returns True if someone has won within his turn, otherwise False.
+        """
+        if self.apply_penalties(player):
+            return False
+
+        if self.events:
+            self.events.emit(TurnStarted(player, self.seat_of(player) + 1, self.discards[-1], self.direction))
+
+        discardable = self.get_discardable_cards(player.hand)
+        card = await self.ask_for_card(player, discardable) if discardable else None
+        if card:
+            await self.discard_card(player, card)
+            return not player.hand
+        await self.draw_and_discard(player, bool(discardable))
+        return False
+
+    async def ask_for_card(self, player, discardable):
+        """Have a player select one of the discardable cards.
+
+        Returns the selected card, or a falsy value if the player chooses not to discard.
+        """
+        return await resolve(player.select_card(discardable, self.get_normalized_hand_sizes(player)))
+
+    async def ask_for_card_option(self, player, card):
+        """Ask a player whether to discard a card that was drawn after nothing was discarded.
+
+        Returns True if the card is to be discarded.
+        """
+        return await resolve(player.select_card_option(card, self.others(player)))
+
+    async def discard_card(self, player, card):
+        """Discard a card and apply its game effects.
+
+        Parameters:
+        player - Player who discards card;
+        card - Card to be discarded.
+        """
+        # Only a J asks the player for a decision, all other cards are discarded by Switch.
+        if card.value != 'J':
+            super().discard_card(player, card)
+            return
+        player.hand.remove(card)
+        self.hand_sizes[self.seat_of(player)] -= 1
+        self.discards.append(card)
+        if self.events:
+            self.events.emit(CardDiscarded(player, card))
+        if player.hand:
+            self.swap_hands(player, await resolve(player.ask_for_swap(self.others(player))))
+
+    async def draw_and_discard(self, player, no_discard=False):
+        """Draw a card from stock and ask whether the player wants to
+        discard it if possible.
+
+        Parameters:
+        player - Player that draws the card.
+        no_discard - A boolean value that shows whether the player has chosen not to
+            discard a card this turn (default False).
+        """
+        if self.events:
+            self.events.emit(DrawingCard(player, no_discard))
+        if not self.pick_up_card(player):
+            return
+        card = player.hand[-1]
+        if self.can_discard(card):
+            if await self.ask_for_card_option(player, card):
+                await self.discard_card(player, card)
+            elif self.events:
+                self.events.emit(CardKept(player, card))
+        elif self.events:
+            self.events.emit(DiscardRefused(player, card))
+
+
+def describe_event(event):
+    """Return a line describing a game event to the players at a table, or None."""
+    typ = type(event)
+    if typ is TurnStarted:
+        direction = "clockwise" if event.direction == 1 else "anti-clockwise"
+        return (f"INFO Turn of player {event.index}: {event.player.name}, hand size {len(event.player.hand)}, "
+                f"top card {event.top_card}, direction {direction}")
+    elif typ is PlayerSkipped:
+        return f"INFO {event.player.name} is skipped."
+    elif typ is CardsDrawn:
+        return f"INFO {event.player.name} draws {event.amount} cards."
+    elif typ is DrawingCard:
+        return f"INFO {event.player.name} draws a card."
+    elif typ is CardDiscarded:
+        return f"INFO {event.player.name} discards {event.card}."
+    elif typ is CardKept:
+        return f"INFO {event.player.name} adds the card to their hand."
+    elif typ is DiscardRefused:
+        return f"INFO {event.player.name} cannot discard the card."
+    elif typ is DirectionReversed:
+        return "INFO Game direction reversed."
+    elif typ is HandsSwapped:
+        return f"INFO {event.player_1.name} swaps hands with {event.player_2.name}."
+    elif typ is Reshuffled:
+        return "INFO Discards are shuffled back."
+    elif typ is StockExhausted:
+        return "INFO All cards distributed."
+    elif typ is Won:
+        return f"WON {event.player.name}"
+    elif typ is Drawn:
+        return f"DRAWN {event.reason}"
+    return None
+
+
+class Table:
+    """A table of remote and AI players playing a round of switch."""
+    def __init__(self, players):
+        self.game = AsyncSwitch(EventBus(self.broadcast))
+        self.game.players = list(players)
+        self.remote = [player for player in players if isinstance(player, RemotePlayer)]
+
+    def broadcast(self, event):
+        """Send a game event to the remote players at the table."""
+        line = describe_event(event)
+        if line is None:
+            return
+        for player in self.remote:
+            player.connection.send(line)
+        # Only the player whose turn it is sees their hand.
+        if type(event) is TurnStarted and event.player in self.remote:
+            event.player.connection.send("HAND " + ", ".join(str(card) for card in event.player.hand))
+
+    async def play(self):
+        """Play a round and close the connections of the remote players.
+
+        Returns the winner of the round, or None if the round was drawn.
+        """
+        try:
+            return await self.game.run_round()
+        finally:
+            await asyncio.gather(*(player.connection.close() for player in self.remote))
+
+
+class SwitchServer:
+    """Hosts tables of switch for remote players.
+
+    Connecting players are seated at the next table. Once it has
+    the number of remote players of a table, AI players take the remaining
+    seats and the round starts as its own task.
+
+    SwitchServer objects have:
+
+    self.humans - int, number of remote players per table;
+    self.ais - tuple of the AI_TYPES of the AI players per table;
+    self.waiting - list of RemotePlayers waiting for their table to start;
+    self.tables - set of the tasks of running tables;
+    self.rounds - int, number of rounds finished.
+    """
+    def __init__(self, humans=1, ais=('smart', 'smart')):
+        if humans < 1 or not 2 <= humans + len(ais) <= MAX_PLAYERS:
+            raise ValueError(f"A table needs at least 1 remote player and 2 to {MAX_PLAYERS} players in total")
+        for typ in ais:
+            if typ not in AI_TYPES:
+                raise ValueError(f"Seat type must be one of {', '.join(AI_TYPES)}: {typ!r}")
+        self.humans = humans
+        self.ais = tuple(ais)
+        self.waiting = []
+        self.tables = set()
+        self.rounds = 0
+
+    async def handle(self, reader, writer):
+        """Seat a connecting player and wait until their round is over."""
+        connection = Connection(reader, writer)
+        connection.send("WELCOME Welcome to the Switch server. Please enter your name:")
+        name = await connection.get_string_input() or f"Player {self.rounds * self.humans + len(self.waiting) + 1}"
+        player = RemotePlayer(name, connection)
+        self.waiting.append(player)
+        if len(self.waiting) < self.humans:
+            connection.send("INFO Waiting for other players ...")
+        else:
+            players, self.waiting = self.waiting, []
+            players += [player_classes[typ](f"{typ} {idx + 1}") for idx, typ in enumerate(self.ais)]
+            task = asyncio.create_task(self.play(Table(players)))
+            self.tables.add(task)
+            task.add_done_callback(self.tables.discard)
+        # The table closes the connection once the round is over.
+        await connection.finished.wait()
+
+    async def play(self, table):
+        """Play the round of a table."""
+        await table.play()
+        self.rounds += 1
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """Start serving on a TCP port, or on a Unix socket if a path is given.
+
+        Returns the asyncio.Server.
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path, backlog=BACKLOG)
+        return await asyncio.start_server(self.handle, host, port, backlog=BACKLOG)
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, humans=1, ais=('smart', 'smart')):
+    """Run a SwitchServer until cancelled."""
+    server = await SwitchServer(humans, ais).start(host, port, path)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """Run the server from the command line."""
+    parser = argparse.ArgumentParser(description="Host tables of switch for players connecting over sockets.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="TCP host to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="TCP port to listen on")
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--humans', type=int, default=1, help="remote players per table")
+    parser.add_argument('--ais', nargs='*', default=['smart', 'smart'], choices=AI_TYPES, help="AI players per table")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.humans, args.ais))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""Headless simulation of AI-only rounds of the switch game."""
+import contextlib
+import io
+import random
+import time
+from collections import namedtuple
+
+from cards import Hand, cards_in_mask
+from events import NullEventBus
+from players import player_classes
+from seeding import seed_game
+from switch import PLAYABLE_MASKS, Switch
+
+
+# Number of turns after which a simulated round is drawn by default.
+MAX_TURNS = 10000
+
+# A compact record of a finished round: the winner's seat index or None if the round was drawn,
+# the number of turns played, the number of reshuffles of the discard pile
+# and the reason why the round was drawn (switch.TURN_CAP or switch.REPETITION) or None.
+RoundResult = namedtuple('RoundResult', ['winner', 'turns', 'reshuffles', 'drawn'], defaults=(None,))
+
+
+class HeadlessSwitch(Switch):
+    """A Switch game for AI-only rounds without any user interface.
+
+    HeadlessSwitch plays by the same rules as Switch, but never calls
+    user_interface and never formats any messages, which makes it suitable
+    for running large numbers of rounds between SimpleAI and SmartAI players.
+    Players are dealt Hands, so discardable cards are found with bitmasks
+    and cards are added and removed in O(1).
+    Keyword arguments such as decks and max_players set the limits of Switch.
+    Rounds are drawn after MAX_TURNS turns unless max_turns is given, so a
+    stalled round never holds up a batch of simulations.
+
+    In addition to the Switch attributes, HeadlessSwitch objects have:
+
+    self.reshuffles - int, number of times discards were shuffled back into stock.
+    """
+    __slots__ = ('reshuffles',)
+
+    def __init__(self, players=(), rng=None, **limits):
+        limits.setdefault('max_turns', MAX_TURNS)
+        super().__init__(NullEventBus(), rng, **limits)
+        self.players = list(players)
+        self.reshuffles = 0
+
+    def deal(self):
+        """Give the players empty Hands and set up a new round."""
+        # Players may be reused across rounds, so their hands are emptied before dealing.
+        for player in self.players:
+            player.hand = Hand()
+        self.setup_round()
+        self.reshuffles = 0
+
+    def run_round(self):
+        """Run a single round of Switch.
+
+        Returns a RoundResult of the finished or drawn round.
+        """
+        self.deal()
+        return self.play()
+
+    def play(self, max_turns=None):
+        """Play the round on from the current player until it is won or drawn.
+
+        Keyword arguments:
+        max_turns - number of turns after which to stop, or None to play until the round is over (default None).
+
+        Returns a RoundResult of the finished or drawn round, or None if it was stopped after max_turns.
+        """
+        players = self.players
+        count = len(players)
+        stop = None if max_turns is None else self.turns + max_turns
+        cap = self.max_turns
+        while self.turns != stop:
+            # Only a full stock and a turn count below the cap are checked on every turn.
+            if not self.stock or self.turns == cap:
+                reason = self.draw_reason()
+                if reason:
+                    return RoundResult(None, self.turns, self.reshuffles, reason)
+            i = self.current
+            player = players[i]
+            self.turns += 1
+            self.run_player(player)
+            if not player.hand:
+                return RoundResult(i, self.turns, self.reshuffles)
+            # Advance the current player depending on the game's direction, like Switch.advance.
+            self.current = (i + self.direction) % count
+        return None
+
+    def run_player(self, player):
+        """Process a single player's turn.
+
+        Parameters:
+        player - Player to make the turn.
+
+        Returns True if someone has won within his turn, otherwise False.
+        """
+        if self.apply_penalties(player):
+            return False
+        discardable = self.get_discardable_cards(player.hand)
+        if discardable:
+            card = self.ask_for_card(player, discardable)
+            if card:
+                self.discard_card(player, card)
+                return not player.hand
+        self.draw_and_discard(player)
+        return False
+
+    def apply_penalties(self, player):
+        """Apply pending penalties to a player at the start of their turn.
+
+        Returns True if the player is skipped, otherwise False.
+        """
+        if self.skip:
+            self.skip = False
+            return True
+        if self.draw2:
+            self.pick_up_card(player, 2)
+            self.draw2 = False
+        if self.draw4:
+            self.pick_up_card(player, 4)
+            self.draw4 = False
+        return False
+
+    def get_discardable_cards(self, hand):
+        """Return the list of cards in a Hand that can be discarded."""
+        return cards_in_mask(hand.mask & PLAYABLE_MASKS[self.discards[-1].id])
+
+    def pick_up_card(self, player, amount=1):
+        """Pick up cards from stock and add them to player hand.
+
+        Behaves like Switch.pick_up_card, but counts reshuffles
+        instead of printing messages.
+        """
+        stock = self.stock
+        hand = player.hand
+        seat = self.seat_of(player)
+        for i in range(amount):
+            if not stock:
+                if len(self.discards) == 1:
+                    self.hand_sizes[seat] += i
+                    return i
+                # Add back discarded cards excluding the top card.
+                self.reshuffle()
+                stock = self.stock
+                self.reshuffles += 1
+            hand.append(stock.pop())
+        self.hand_sizes[seat] += amount
+        return amount
+
+    def discard_card(self, player, card):
+        """Discard a card and apply its game effects.
+
+        Parameters:
+        player - Player who discards card;
+        card - Card to be discarded.
+        """
+        player.hand.remove(card)
+        self.hand_sizes[self.seat_of(player)] -= 1
+        self.discards.append(card)
+        if not player.hand:
+            return
+        value = card.value
+        if value == '8':
+            self.skip = True
+        elif value == '2':
+            self.draw2 = True
+        elif value == 'Q':
+            self.draw4 = True
+        elif value == 'K':
+            self.direction *= -1
+        elif value == 'J':
+            self.swap_hands(player, player.ask_for_swap(self.others(player)))
+
+    def draw_and_discard(self, player, no_discard=False):
+        """Draw a card from stock and let the player decide whether
+        to discard it if possible.
+
+        Parameters:
+        player - AI player that draws the card.
+        no_discard - unused, kept for compatibility with Switch.draw_and_discard.
+        """
+        if not self.pick_up_card(player):
+            return
+        card = player.hand[-1]
+        if card.mask & PLAYABLE_MASKS[self.discards[-1].id] and self.ask_for_card_option(player, card):
+            self.discard_card(player, card)
+
+    def swap_hands(self, player_1, player_2):
+        """Exchanges the hands of the two given players."""
+        player_1.hand, player_2.hand = player_2.hand, player_1.hand
+        sizes, seat_1, seat_2 = self.hand_sizes, self.seat_of(player_1), self.seat_of(player_2)
+        sizes[seat_1], sizes[seat_2] = sizes[seat_2], sizes[seat_1]
+
+
+def create_players(seats):
+    """Create AI players for a seat line-up.
+
+    Parameters:
+    seats - sequence of player_classes keys, e.g. ['simple', 'smart'].
+
+    Returns a list of player objects named after their seat.
+    """
+    return [player_classes[typ](f"{typ} {idx + 1}") for idx, typ in enumerate(seats)]
+
+
+def play_round(seats, seed=None):
+    """Play a single headless round for a seat line-up.
+
+    Parameters:
+    seats - sequence of player_classes keys of AI players.
+
+    Keyword arguments:
+    seed - seed of the random streams of the round, or None to use the random module (default None).
+
+    Returns the RoundResult of the round.
+    """
+    game = HeadlessSwitch(create_players(seats))
+    if seed is not None:
+        seed_game(game, seed)
+    return game.run_round()
+
+
+def benchmark(seats=('simple', 'smart', 'smart'), games=2000):
+    """Measure games per second of HeadlessSwitch and Switch.run_round.
+
+    Parameters:
+    seats - sequence of player_classes keys of AI players;
+    games - number of rounds played by each engine.
+
+    Returns a tuple (headless games/sec, Switch games/sec).
+    """
+    random.seed(0)
+    game = HeadlessSwitch(create_players(seats))
+    start = time.perf_counter()
+    for _ in range(games):
+        game.run_round()
+    headless = games / (time.perf_counter() - start)
+
+    # The console output of Switch is discarded, but still formatted and printed.
+    random.seed(0)
+    game = Switch()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(games):
+            game.players = create_players(seats)
+            game.run_round()
+    console = games / (time.perf_counter() - start)
+    return headless, console
+
+
+if __name__ == '__main__':
+    headless_rate, console_rate = benchmark()
+    print(f"HeadlessSwitch.run_round: {headless_rate:10.1f} games/sec")
+    print(f"Switch.run_round:         {console_rate:10.1f} games/sec")
+    print(f"Speed-up:                 {headless_rate / console_rate:10.2f}x")
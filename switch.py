@@ -1,14 +1,139 @@
 """Main module of the switch game."""
 import random
+from collections import namedtuple
+from collections.abc import Sequence
 from players import player_classes
 import user_interface as ui
 
-from cards import generate_deck
+from events import (EventBus, RoundStarted, TurnStarted, PlayerSkipped, CardsDrawn, DrawingCard, CardDiscarded,
+                    CardKept, DiscardRefused, DirectionReversed, HandsSwapped, Reshuffled, StockExhausted, Won, Drawn)
+from cards import DECK, Hand, MaskHand, cards_in_mask, generate_deck
 
 
-# Set the constant game values.
+# Set the default game values, see Switch.
 MAX_PLAYERS = 4
 HAND_SIZE = 7
+DECKS = 1
+MAX_REPETITIONS = 3
+
+# Reasons why a round is drawn, see Switch.draw_reason.
+TURN_CAP = 'turn cap'
+REPETITION = 'repetition'
+
+
+def is_discardable(card, top_card):
+    """Return whether a card can be discarded onto top_card by the rules of the game."""
+    # Q and A can always be discarded.
+    if card.value in 'QA':
+        return True
+    # Otherwise either suit or value has to match with the top card.
+    return card.suit == top_card.suit or card.value == top_card.value
+
+
+def playable_mask(top_card):
+    """Return the mask of all cards that can be discarded onto top_card."""
+    mask = 0
+    for card in DECK:
+        if is_discardable(card, top_card):
+            mask |= card.mask
+    return mask
+
+
+# Masks of discardable cards, indexed by the id of the top card.
+PLAYABLE_MASKS = tuple(playable_mask(card) for card in DECK)
+
+# Discard legality, indexed by the ids of the top card and the candidate card.
+DISCARD_TABLE = tuple(tuple(is_discardable(card, top_card) for card in DECK) for top_card in DECK)
+
+# An immutable snapshot of a round, see Switch.snapshot. Hands, stock and discards are tuples of cards.
+GameState = namedtuple('GameState', ['hands', 'stock', 'discards', 'skip', 'draw2', 'draw4', 'direction', 'current'])
+
+
+class HandSizes(Sequence):
+    """The hand sizes of a table in normal form, as seen from one seat.
+
+    Position 0 is the seat itself, position 1 the next seat in the direction
+    of play and so on. A view reads the list of hand sizes by seat that the
+    game keeps up to date, so creating one copies nothing and single sizes are
+    looked up in O(1). A view compares equal to a list of the same sizes.
+    """
+    __slots__ = ('sizes', 'seat', 'direction')
+
+    def __init__(self, sizes, seat, direction):
+        self.sizes = sizes
+        self.seat = seat
+        self.direction = direction
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.normalized()[index]
+        count = len(self.sizes)
+        if not -count <= index < count:
+            raise IndexError("hand size index out of range")
+        return self.sizes[(self.seat + self.direction * index) % count]
+
+    def __iter__(self):
+        return iter(self.normalized())
+
+    def __eq__(self, other):
+        if isinstance(other, (HandSizes, list, tuple)):
+            return self.normalized() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"HandSizes({self.normalized()})"
+
+    def normalized(self):
+        """Return the sizes in normal form as a new list."""
+        sizes, seat = self.sizes, self.seat
+        if self.direction == 1:
+            return sizes[seat:] + sizes[:seat]
+        return sizes[seat::-1] + sizes[:seat:-1]
+
+
+class OtherPlayers(Sequence):
+    """The players of a table except the one in a seat, in seat order.
+
+    A view is created without copying the list of players, so offering
+    the other players of a large table to a player who discards a J costs
+    O(1) until the player looks at them. Their hand sizes are copied from
+    the list of hand sizes by seat that the game keeps up to date.
+    """
+    __slots__ = ('players', 'seat', 'sizes')
+
+    def __init__(self, players, seat, sizes):
+        self.players = players
+        self.seat = seat
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.players) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        count = len(self.players) - 1
+        if not -count <= index < count:
+            raise IndexError("player index out of range")
+        index %= count
+        return self.players[index + 1 if index >= self.seat else index]
+
+    def __iter__(self):
+        players, seat = self.players, self.seat
+        for idx in range(len(players)):
+            if idx != seat:
+                yield players[idx]
+
+    def __repr__(self):
+        return f"OtherPlayers({list(self)})"
+
+    def hand_sizes(self):
+        """Return the sizes of the players' hands as a new list, in the order of the view."""
+        sizes, seat = self.sizes, self.seat
+        return sizes[:seat] + sizes[seat+1:]
 
 
 class Switch:
@@ -25,9 +150,45 @@ class Switch:
     self.skip - bool indicating that the next player is skipped;
     self.draw2 - bool indicating that the next player must draw 2 cards;
     self.draw4 - bool indicating that the next player must draw 4 cards;
-    self.direction - int, either 1 or -1, indicating the direction of the game.
+    self.direction - int, either 1 or -1, indicating the direction of the game;
+    self.current - int, index of the player whose turn it is;
+    self.hand_sizes - list of the sizes of the players' hands by seat, kept up to date
+        by the methods that move cards between hands;
+    self.events - EventBus to which game events are emitted;
+    self.rng - random.Random or the random module, used to shuffle cards;
+    self.decks - int, number of 52 card decks shuffled into the stock;
+    self.hand_size - int, number of cards dealt to every player;
+    self.max_players - int, maximum number of players of a round;
+    self.max_turns - int, number of turns after which a round is drawn, or None for no limit;
+    self.max_repetitions - int, number of times a state may occur before a round is drawn,
+        or None for no limit;
+    self.turns - int, number of turns played in the current round.
+
+    Large tables are set up by raising the limits, e.g. Switch(decks=4,
+    max_players=200) seats up to 200 players and deals from 208 cards.
+    Copies of a card from different decks are the same Card object.
+
+    By default, events are printed to the console by user_interface.print_event
+    and cards are shuffled with the global random module.
+    Events are only created when the bus has subscribers.
     """
-    def __init__(self):
+    # The instance __dict__ stays unallocated unless a method of a single game is
+    # replaced, e.g. by profiling.TurnProfiler.
+    __slots__ = ('events', 'rng', 'decks', 'hand_size', 'max_players', 'max_turns', 'max_repetitions', 'turns',
+                 'repetitions', '_players', 'hand_sizes', 'stock', 'discards', 'skip', 'draw2', 'draw4',
+                 'direction', 'current', '__dict__')
+
+    def __init__(self, events=None, rng=None, decks=DECKS, hand_size=HAND_SIZE, max_players=MAX_PLAYERS,
+                 max_turns=None, max_repetitions=MAX_REPETITIONS):
+        self.events = EventBus(ui.print_event) if events is None else events
+        self.rng = random if rng is None else rng
+        self.decks = decks
+        self.hand_size = hand_size
+        self.max_players = max_players
+        self.max_turns = max_turns
+        self.max_repetitions = max_repetitions
+        self.turns = 0
+        self.repetitions = {}
         self.players = []
         self.stock = []
         self.discards = []
@@ -35,6 +196,17 @@ class Switch:
         self.draw2 = False
         self.draw4 = False
         self.direction = 1
+        self.current = 0
+
+    @property
+    def players(self):
+        return self._players
+
+    @players.setter
+    def players(self, players):
+        # Seating players counts their hands.
+        self._players = players
+        self.hand_sizes = [len(player.hand) for player in players]
 
     def run_game(self):
         """Run rounds of the game until player decides to exit."""
@@ -45,7 +217,7 @@ class Switch:
             choice = ui.get_int_input(1, 2)
             if choice == 1:
                 # Set up self.players before the round starts.
-                player_info = ui.get_player_information(MAX_PLAYERS)
+                player_info = ui.get_player_information(self.max_players)
                 self.players = [player_classes[typ](name) for typ, name in player_info]
                 self.run_round()
             # If the input is 2, exit the game and print goodbye message.
@@ -57,51 +229,164 @@ class Switch:
         """Run a single round of Switch.
 
         Continuously calls run_player method for the current player,
-        and advances the current player depending on the current game direction.
+        and advances the current player depending on the current game direction,
+        until a player wins or the round is drawn.
         """
         # Deal cards and set up game round.
         self.setup_round()
 
-        # Current player index.
-        i = 0
         while True:
+            # End the round if it has stalled.
+            reason = self.draw_reason()
+            if reason:
+                if self.events:
+                    self.events.emit(Drawn(reason))
+                break
             # Run current player's turn.
-            self.run_player(self.players[i])
+            player = self.players[self.current]
+            self.turns += 1
+            self.run_player(player)
             # Check if the player's hand is empty - if it is, they won and the game ends.
-            won = not self.players[i].hand
-            if won:
-                ui.print_winner_of_game(self.players[i])
+            if not player.hand:
+                if self.events:
+                    self.events.emit(Won(player))
                 break
             # If the player didn't win, the game progresses to the next player based on the game's direction.
-            else:
-                if i == len(self.players) - 1 and self.direction == 1:
-                    i = 0
-                elif i == 0 and self.direction == -1:
-                    i = len(self.players) - 1
-                else:
-                    i = i + self.direction
-                continue
+            self.advance()
+
+    def draw_reason(self):
+        """Return the reason why the round is drawn before the next turn, or None to play on.
+
+        A round is drawn with TURN_CAP after max_turns turns, or with
+        REPETITION when the same state occurs for the max_repetitions-th time.
+        States are only counted while the stock is empty, as only then can a
+        round stall, e.g. when all cards are held and nobody can discard.
+        """
+        if self.max_turns is not None and self.turns >= self.max_turns:
+            return TURN_CAP
+        if not self.stock and self.max_repetitions:
+            key = self.state_key()
+            seen = self.repetitions[key] = self.repetitions.get(key, 0) + 1
+            if seen >= self.max_repetitions:
+                return REPETITION
+        return None
+
+    def state_key(self):
+        """Return a hashable key of the state of the round.
+
+        The order of the cards in a hand does not matter, the order of the stock and the discards does.
+        """
+        hands = tuple(tuple(sorted(card.id for card in player.hand)) for player in self.players)
+        return (hands, tuple(card.id for card in self.stock), tuple(card.id for card in self.discards),
+                self.current, self.direction, self.skip, self.draw2, self.draw4)
+
+    def advance(self):
+        """Pass the turn to the next seat in the direction of play."""
+        self.current = (self.current + self.direction) % len(self.players)
+
+    def seat_of(self, player):
+        """Return the index of a player's seat.
+
+        The seat of the player whose turn it is is found without searching.
+        """
+        players, current = self._players, self.current
+        if current < len(players) and players[current] is player:
+            return current
+        return players.index(player)
+
+    def others(self, player):
+        """Return an OtherPlayers view of the players except a player."""
+        return OtherPlayers(self._players, self.seat_of(player), self.hand_sizes)
+
+    def sync_hand_sizes(self):
+        """Recount the hand sizes by seat from the players' hands.
+
+        Needed only after hands were changed other than by the methods of the game.
+        """
+        self.hand_sizes[:] = [len(player.hand) for player in self.players]
 
     def setup_round(self):
         """Initialize a round of Switch.
 
-        Sets the stock to a full shuffled deck of cards, initializes
+        Sets the stock to self.decks shuffled decks of cards, initializes
         the discard pile with its first card, deals all players their
         hands and sets game flags to their initial values.
+
+        Raises ValueError if there are more than self.max_players players
+        or not enough cards to deal their hands and a top card.
         """
+        if len(self.players) > self.max_players:
+            raise ValueError(f"A round has at most {self.max_players} players, got {len(self.players)}")
+        if len(self.players) * self.hand_size >= self.decks * len(DECK):
+            raise ValueError(f"{self.decks} deck(s) are not enough to deal {self.hand_size} cards "
+                             f"to {len(self.players)} players")
         # Shuffle deck of cards and initialize discard pile with a top card.
-        self.stock = generate_deck()
-        random.shuffle(self.stock)
+        self.stock = generate_deck(self.decks)
+        self.shuffle(self.stock)
+        if self.events:
+            self.events.emit(RoundStarted(tuple(self.stock)))
         self.discards = [self.stock.pop()]
         # Deal hands.
+        self.sync_hand_sizes()
+        for player in self.players:
+            self.pick_up_card(player, self.hand_size)
+        # Players that look at the whole game, such as MonteCarloAI, are told which game they are seated in.
         for player in self.players:
-            self.pick_up_card(player, HAND_SIZE)
+            if hasattr(player, 'game'):
+                player.game = self
         # Set game flags to initial values.
+        self.turns = 0
+        self.repetitions = {}
+        self.current = 0
         self.direction = 1
         self.skip = False
         self.draw2 = False
         self.draw4 = False
 
+    def snapshot(self):
+        """Return the state of the round as an immutable GameState.
+
+        Taking a snapshot copies references to at most 52 cards per deck, so it is cheap
+        enough to save the state before every move of a search and restore it afterwards.
+        """
+        return GameState(tuple(tuple(player.hand) for player in self.players), tuple(self.stock),
+                         tuple(self.discards), self.skip, self.draw2, self.draw4, self.direction, self.current)
+
+    def restore(self, state):
+        """Restore the round to a GameState returned by snapshot.
+
+        The cards are put back into the hand, stock and discard lists the game
+        currently holds, so hands keep their type (e.g. CountedHand) and no lists are allocated.
+        States seen before the restore no longer count towards a repetition draw.
+        """
+        for player, hand in zip(self.players, state.hands):
+            player.hand[:] = hand
+        self.sync_hand_sizes()
+        self.stock[:] = state.stock
+        self.discards[:] = state.discards
+        self.skip = state.skip
+        self.draw2 = state.draw2
+        self.draw4 = state.draw4
+        self.direction = state.direction
+        self.current = state.current
+        self.repetitions = {}
+
+    def shuffle(self, cards):
+        """Shuffle a list of cards in place."""
+        self.rng.shuffle(cards)
+
+    def reshuffle(self):
+        """Shuffle the discards, except the top card, back into the empty stock.
+
+        The stock and discard lists swap roles: the list of discards becomes
+        the stock and is shuffled in place, and the empty stock list takes the
+        top card. Reshuffling therefore neither allocates nor copies a list.
+        """
+        top = self.discards.pop()
+        self.stock, self.discards = self.discards, self.stock
+        self.discards.append(top)
+        self.shuffle(self.stock)
+
     def run_player(self, player):
         """Process a single player's turn.
 
@@ -116,36 +401,17 @@ class Switch:
         draw_and_discard is called to draw from stock.
         """
         # Apply any pending penalties (skip, draw2, draw4).
-        if self.skip:
-            self.skip = False
-            ui.print_message('{} is skipped.'.format(player.name))
+        if self.apply_penalties(player):
             return False
 
-        if self.draw2:
-            picked = self.pick_up_card(player, 2)
-            self.draw2 = False
-            ui.print_message('{} draws {} cards.'.format(player.name, picked))
-
-        if self.draw4:
-            picked = self.pick_up_card(player, 4)
-            self.draw4 = False
-            ui.print_message('{} draws {} cards.'.format(player.name, picked))
-
-        top_card = self.discards[-1]
-        player_index = self.players.index(player) + 1
-        direction = "Clockwise" if self.direction == 1 else "Anti-clockwise"
-        ui.print_player_info(player, top_card, player_index, direction)
+        if self.events:
+            self.events.emit(TurnStarted(player, self.seat_of(player) + 1, self.discards[-1], self.direction))
 
         # Determine discardable cards.
-        discardable = []
-        for card in player.hand:
-            if not self.can_discard(card):
-                continue
-            discardable.append(card)
+        discardable = self.get_discardable_cards(player.hand)
 
         # Have the player select a card.
-        hands = self.get_normalized_hand_sizes(player)
-        card = player.select_card(discardable, hands) if discardable else None
+        card = self.ask_for_card(player, discardable) if discardable else None
 
         if card:
             # Discard a card and determine whether the player has won.
@@ -159,14 +425,63 @@ class Switch:
             self.draw_and_discard(player, False)
         return False
 
+    def apply_penalties(self, player):
+        """Apply pending penalties to a player at the start of their turn.
+
+        Parameters:
+        player - Player to make the turn.
+
+        Returns True if the player is skipped, otherwise False.
+        """
+        if self.skip:
+            self.skip = False
+            if self.events:
+                self.events.emit(PlayerSkipped(player))
+            return True
+
+        if self.draw2:
+            picked = self.pick_up_card(player, 2)
+            self.draw2 = False
+            if self.events:
+                self.events.emit(CardsDrawn(player, picked))
+
+        if self.draw4:
+            picked = self.pick_up_card(player, 4)
+            self.draw4 = False
+            if self.events:
+                self.events.emit(CardsDrawn(player, picked))
+        return False
+
+    def ask_for_card(self, player, discardable):
+        """Have a player select one of the discardable cards.
+
+        Returns the selected card, or a falsy value if the player chooses not to discard.
+        """
+        return player.select_card(discardable, self.get_normalized_hand_sizes(player))
+
+    def ask_for_card_option(self, player, card):
+        """Ask a player whether to discard a card that was drawn after nothing was discarded.
+
+        AIs choose based on strategy and circumstances, human players are asked.
+        Returns True if the card is to be discarded.
+        """
+        if player.is_ai:
+            return player.select_card_option(card, self.others(player))
+        return player.select_card_option(card)
+
     def can_discard(self, card):
         """Return whether a card can be discarded."""
-        # Q and A can always be discarded.
-        if card.value in 'QA':
-            return True
-        # Otherwise either suit or value has to match with the top card.
-        top_card = self.discards[-1]
-        return card.suit == top_card.suit or card.value == top_card.value
+        return DISCARD_TABLE[self.discards[-1].id][card.id]
+
+    def get_discardable_cards(self, hand):
+        """Return the list of cards in a hand that can be discarded.
+
+        If the hand is a MaskHand or a Hand, the discardable cards are found
+        with a single AND of its mask and the playable mask of the top card.
+        """
+        if isinstance(hand, (MaskHand, Hand)):
+            return cards_in_mask(hand.mask & PLAYABLE_MASKS[self.discards[-1].id])
+        return [card for card in hand if self.can_discard(card)]
 
     def pick_up_card(self, player, amount=1):
         """Pick up a card from stock and add to player hand.
@@ -184,20 +499,22 @@ class Switch:
         discard are shuffled back into the stock. If this is still not
         sufficient, the maximum possible number of cards is picked.
         """
+        seat = self.seat_of(player)
         for i in range(1, amount+1):
             # If there are no more cards in the stock pile.
             if not self.stock:
                 if len(self.discards) == 1:
-                    ui.print_message("All cards distributed")
+                    if self.events:
+                        self.events.emit(StockExhausted())
                     return i-1
                 # Add back discarded cards excluding the top card.
-                self.stock = self.discards[:-1]
-                del self.discards[:-1]
-                random.shuffle(self.stock)
-                ui.print_message("Discards are shuffled back.")
+                self.reshuffle()
+                if self.events:
+                    self.events.emit(Reshuffled(tuple(self.stock)))
             # Draw a stock card and append it to player's hand.
             card = self.stock.pop()
             player.hand.append(card)
+            self.hand_sizes[seat] += 1
             if i == amount:
                 return i
             else:
@@ -212,8 +529,10 @@ class Switch:
         """
         # Remove card from player's hand and add it to discard pile.
         player.hand.remove(card)
+        self.hand_sizes[self.seat_of(player)] -= 1
         self.discards.append(card)
-        ui.print_discard_result(True, card)
+        if self.events:
+            self.events.emit(CardDiscarded(player, card))
         # If the player's hand is empty, the player won.
         if not player.hand:
             return
@@ -229,11 +548,11 @@ class Switch:
         # If card is a K, game direction reverses.
         elif card.value == 'K':
             self.direction *= -1
-            ui.print_message("Game direction reversed.")
+            if self.events:
+                self.events.emit(DirectionReversed(self.direction))
         # If card is a J, ask player with whom to swap hands.
         elif card.value == 'J':
-            others = [p for p in self.players if p is not player]
-            choice = player.ask_for_swap(others)
+            choice = player.ask_for_swap(self.others(player))
             self.swap_hands(player, choice)
 
     def draw_and_discard(self, player, no_discard=False):
@@ -249,66 +568,44 @@ class Switch:
         player's hand. If the card can be discarded, discard_card method is
         called with the newly picked card.
         """
-        # Print out a message depending on whether the player chose not to discard or had no discardable cards.
-        if no_discard:
-            ui.print_message(f"{player.name} has chosen not to discard. Drawing ...")
-        else:
-            ui.print_message("No matching card. Drawing ...")
+        if self.events:
+            self.events.emit(DrawingCard(player, no_discard))
         # Return if no card could be picked.
         if not self.pick_up_card(player):
             return
-        # Discard picked card if possible.
+        # Discard picked card if possible and the player chooses to.
         card = player.hand[-1]
-        # AIs choose whether to discard (if possible) based on strategy and circumstances.
-        if self.can_discard(card) and player.is_ai:
-            others = [p for p in self.players if p is not player]
-            choice = player.select_card_option(card, others)
-            if choice:
-                self.discard_card(player, card)
-            else:
-                player.hand.append(card)
-                ui.print_message(f"{player.name} has chosen to add the card to their hand.")
-        # Human players are asked whether they want to discard the card (if possible).
-        elif self.can_discard(card) and not player.is_ai:
-            choice = player.select_card_option(card)
-            if choice:
+        if self.can_discard(card):
+            # The drawn card is already in the player's hand, so it is kept simply by not discarding it.
+            if self.ask_for_card_option(player, card):
                 self.discard_card(player, card)
-            else:
-                player.hand.append(card)
+            elif self.events:
+                self.events.emit(CardKept(player, card))
         # Inform the player if the card could not be discarded.
-        elif not player.is_ai:
-            ui.print_discard_result(False, card)
-        elif player.is_ai:
-            ui.print_message("Card cannot be discarded.")
+        elif self.events:
+            self.events.emit(DiscardRefused(player, card))
 
     def get_normalized_hand_sizes(self, player):
-        """Return list of hand sizes in normal form.
+        """Return hand sizes in normal form.
 
         Parameter:
         player - Player for whom to normalize view.
 
-        Returns a list of integers of player sample length.
+        Returns a HandSizes view of as many sizes as there are players.
 
-        The list of hand sizes is rotated and flipped so that the
+        The hand sizes are rotated and flipped so that the
         specified player is always at position 0 and the next player
         (according to current direction of play) at position 1.
         """
-        sizes = [len(p.hand) for p in self.players]
-        idx = self.players.index(player)
-        # Rotate list so that given player is first.
-        sizes = sizes[idx:] + sizes[:idx]
-        # If direction is counter-clockwise.
-        if self.direction == -1:
-            # Reverse the order and bring given player back to the front.
-            sizes.reverse()
-            sizes.insert(0, sizes.pop())
-        return sizes
-
-    @staticmethod
-    def swap_hands(player_1, player_2):
+        return HandSizes(self.hand_sizes, self.seat_of(player), self.direction)
+
+    def swap_hands(self, player_1, player_2):
         """Exchanges the hands of the two given players."""
         player_1.hand, player_2.hand = player_2.hand, player_1.hand
-        ui.print_message(f"{player_1.name} swaps hands with {player_2.name}.")
+        sizes, seat_1, seat_2 = self.hand_sizes, self.seat_of(player_1), self.seat_of(player_2)
+        sizes[seat_1], sizes[seat_2] = sizes[seat_2], sizes[seat_1]
+        if self.events:
+            self.events.emit(HandsSwapped(player_1, player_2))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,122 @@
+"""Test suite for the lockstep batch simulation of the switch game."""
+import random
+
+import pytest
+
+import switch
+from cards import Hand, cards_in_mask, generate_deck
+from players import DEFAULT_WEIGHTS, SimpleAI, SmartAI
+from simulation import create_players
+
+np = pytest.importorskip('numpy')
+batch_simulation = pytest.importorskip('batch_simulation')
+
+
+def test_play_batch__conserves_cards():
+    """Test if every game of a batch holds each card exactly once."""
+    game = batch_simulation.BatchSwitch(['simple', 'smart', 'smart'], 200, seed=1)
+    game.setup_round()
+    for _ in range(30):
+        game.step()
+        for k in range(game.games):
+            cards = np.concatenate([np.flatnonzero(game.hands[k].any(axis=0)),
+                                    game.stock[k, :game.stock_len[k]],
+                                    game.discards[k, :game.discard_len[k]]])
+            assert game.hands[k].sum() + game.stock_len[k] + game.discard_len[k] == 52
+            assert np.array_equal(np.sort(cards), np.arange(52))
+
+
+def test_play_batch__winners_have_empty_hands():
+    """Test if finished games are won by a player without cards."""
+    game = batch_simulation.BatchSwitch(['smart', 'simple'], 300, seed=2)
+    result = game.run()
+    won = result.winner >= 0
+    assert won.all()
+    assert not game.hands[np.arange(300), result.winner].any()
+    assert (result.turns > 0).all()
+
+
+def test_play_batch__matches_run_round_win_rates(capsys):
+    """Test if batch win rates are statistically equivalent to Switch.run_round."""
+    seats = ['simple', 'smart', 'smart']
+    games = 1000
+    random.seed(3)
+    wins = np.zeros(len(seats))
+    game = switch.Switch()
+    for _ in range(games):
+        game.players = create_players(seats)
+        game.run_round()
+        # Rounds that stall are drawn and have no winner.
+        won = [not p.hand for p in game.players]
+        if True in won:
+            wins[won.index(True)] += 1
+    capsys.readouterr()
+    games = wins.sum()
+
+    result = batch_simulation.play_batch(seats, 4000, seed=3)
+    batch_wins = np.bincount(result.winner, minlength=len(seats))
+    rate, batch_rate = wins / games, batch_wins / result.winner.size
+    pooled = (wins + batch_wins) / (games + result.winner.size)
+    error = np.sqrt(pooled * (1 - pooled) * (1 / games + 1 / result.winner.size))
+    assert (np.abs(rate - batch_rate) < 4 * error).all()
+
+
+class DrawRng:
+    """Random stub whose choice picks the option at a given fraction of the options."""
+    def __init__(self, draw):
+        self.draw = draw
+
+    def choice(self, options):
+        return options[int(self.draw * len(options))]
+
+
+def random_tables(rng, tables, seats=3):
+    """Return hands, lists of discardable cards and normalized hand sizes of random tables."""
+    hands, choices, sizes = [], [], []
+    while len(hands) < tables:
+        # Two decks, so that hands may hold copies of a card.
+        hand = Hand(rng.sample(generate_deck(2), rng.randint(1, 12)))
+        cards = cards_in_mask(hand.mask & switch.PLAYABLE_MASKS[rng.randrange(52)])
+        if cards:
+            hands.append(hand)
+            choices.append(cards)
+            sizes.append([len(hand)] + [rng.randint(0, 12) for _ in range(seats - 1)])
+    return hands, choices, sizes
+
+
+def test_batch_decisions__match_scalar_smart_ai():
+    """Test if the batched SmartAI decisions equal those of SmartAI for every table."""
+    rng = random.Random(5)
+    tuned = {name: rng.choice([-1, 1]) * rng.uniform(0, 4) for name in DEFAULT_WEIGHTS}
+    for weights in (DEFAULT_WEIGHTS, tuned):
+        player = SmartAI("Scalar", weights=weights)
+        hands, choices, sizes = random_tables(rng, 2000, seats=rng.randint(2, 5))
+        batched = batch_simulation.smart_select_cards(batch_simulation.choice_masks(choices),
+                                                      batch_simulation.hand_counts(hands),
+                                                      batch_simulation.size_rows(sizes), weights)
+        drawn = [rng.choice(cards) for cards in choices]
+        options = batch_simulation.smart_select_card_options(np.array([card.id for card in drawn]),
+                                                             batch_simulation.hand_counts(hands),
+                                                             batch_simulation.size_rows(sizes), weights)
+        for hand, cards, table_sizes, card, choice, option in zip(hands, choices, sizes, drawn, batched, options):
+            player.hand = hand
+            selected = player.select_card(cards, table_sizes)
+            assert choice == (selected.id if selected else -1)
+            others = [SmartAI("Other") for _ in table_sizes[1:]]
+            for other, size in zip(others, table_sizes[1:]):
+                other.hand = [card] * size
+            assert option == player.select_card_option(card, others)
+
+
+def test_batch_decisions__match_scalar_simple_ai():
+    """Test if the batched SimpleAI decisions equal those of SimpleAI for the same draws."""
+    rng = random.Random(6)
+    hands, choices, _ = random_tables(rng, 2000)
+    draws = np.array([rng.random() for _ in hands])
+    batched = batch_simulation.simple_select_cards(batch_simulation.choice_masks(choices), draws)
+    options = batch_simulation.simple_select_card_options(draws)
+    for cards, draw, choice, option in zip(choices, draws, batched, options):
+        player = SimpleAI("Scalar", DrawRng(draw))
+        selected = player.select_card(cards, None)
+        assert choice == (selected.id if selected else -1)
+        assert option == player.select_card_option(cards[0], [])
@@ -0,0 +1,17 @@
+"""Test suite for the benchmarks of the switch game."""
+import benchmarks
+
+
+def test_benchmarks__run():
+    """Test if every registered benchmark runs."""
+    for name, bench in benchmarks.BENCHMARKS.items():
+        run, ops = bench()
+        run()
+        assert ops > 0, name
+
+
+def test_find_regressions():
+    """Test if only benchmarks slower than baseline and tolerance are reported."""
+    baseline = {'a': 100.0, 'b': 100.0, 'c': 100.0}
+    rates = {'a': 95.0, 'b': 80.0, 'd': 1.0}
+    assert benchmarks.find_regressions(rates, baseline, tolerance=0.1) == [('b', 100.0, 80.0)]
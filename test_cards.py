@@ -0,0 +1,100 @@
+"""Test suite for the cards of the switch game."""
+import pickle
+from copy import deepcopy
+
+import pytest
+
+from cards import Card, CountedHand, DECK, Hand, MaskHand, cards_in_mask, generate_deck
+
+
+def test_card__is_interned():
+    """Test if equal cards are the same object."""
+    assert Card('♣', '2') is Card('♣', '2')
+    assert Card('♡', 'Q') is not Card('♠', 'Q')
+
+
+def test_card__ids():
+    """Test if card ids, suit ids and rank ids match the deck order."""
+    assert [card.id for card in DECK] == list(range(52))
+    card = Card('♡', 'J')
+    assert Card.suits[card.suit_id] == '♡'
+    assert Card.values[card.rank_id] == 'J'
+    assert str(card) == '♡ J'
+
+
+def test_card__rejects_invalid_cards():
+    """Test if cards with invalid suit or value cannot be created."""
+    with pytest.raises(ValueError):
+        Card('♣', '1')
+    with pytest.raises(ValueError):
+        Card('X', '2')
+
+
+def test_card__copies_are_identical():
+    """Test if copying or pickling a card returns the same card."""
+    card = Card('♢', '10')
+    assert deepcopy(card) is card
+    assert pickle.loads(pickle.dumps(card)) is card
+
+
+def test_generate_deck__returns_fresh_list():
+    """Test if generate_deck returns a new list of all 52 cards."""
+    deck = generate_deck()
+    deck.pop()
+    assert len(generate_deck()) == 52
+    assert len(set(generate_deck())) == 52
+
+
+def test_cards_in_mask():
+    """Test if cards_in_mask returns the cards of a mask ordered by id."""
+    cards = [Card('♠', 'A'), Card('♣', '2'), Card('♡', '7')]
+    mask = sum(card.mask for card in cards)
+    assert mask.bit_count() == 3
+    assert cards_in_mask(mask) == sorted(cards, key=lambda card: card.id)
+    assert cards_in_mask(0) == []
+
+
+def test_mask_hand__keeps_mask_up_to_date():
+    """Test if MaskHand updates its mask on every change of the hand."""
+    hand = MaskHand([Card('♣', '2'), Card('♢', '3')])
+    hand.append(Card('♡', '4'))
+    hand.remove(Card('♣', '2'))
+    assert hand.mask == Card('♢', '3').mask | Card('♡', '4').mask
+    assert hand.pop() is Card('♡', '4')
+    hand.extend([Card('♠', 'K')])
+    assert hand == [Card('♢', '3'), Card('♠', 'K')]
+    assert hand.mask == Card('♢', '3').mask | Card('♠', 'K').mask
+    del hand[0]
+    assert hand.mask == Card('♠', 'K').mask
+    hand.clear()
+    assert hand.mask == 0
+
+
+def test_counted_hand__keeps_copies_of_a_card():
+    """Test if a card's bit stays set until the last copy from several decks is removed."""
+    card = Card('♡', 'J')
+    for hand in (MaskHand([card, card]), CountedHand([card, card])):
+        hand.remove(card)
+        assert hand.mask == card.mask
+        hand.pop()
+        assert hand.mask == 0
+    assert generate_deck(3).count(card) == 3
+
+
+def test_hand__counts_and_finds_matching_cards():
+    """Test if a Hand keeps its counts and buckets and finds the cards matching a top card."""
+    cards = [Card('♣', '4'), Card('♢', 'Q'), Card('♣', 'K'), Card('♡', '4'), Card('♠', '9')]
+    hand = Hand(cards)
+    assert hand == CountedHand(cards)
+    assert len(hand) == 5 and hand[-1] is Card('♠', '9')
+    assert hand.matching(Card('♣', '9')) == [Card('♣', '4'), Card('♣', 'K'), Card('♢', 'Q'), Card('♠', '9')]
+    assert hand.of_suit(0) == [Card('♣', '4'), Card('♣', 'K')]
+    hand.remove(Card('♣', '4'))
+    hand.append(Card('♡', '4'))
+    assert hand[-1] is Card('♡', '4') and list(hand)[-1] is Card('♡', '4')
+    assert (hand.suit_counts, hand.rank_counts, hand.qa_count) == \
+        (CountedHand(hand).suit_counts, CountedHand(hand).rank_counts, 1)
+    hand[:] = []
+    assert not hand and hand.mask == 0
+    with pytest.raises(ValueError):
+        hand.remove(Card('♣', '4'))
@@ -0,0 +1,55 @@
+"""Test suite for the compact table state of the switch game."""
+import random
+
+import pytest
+
+import benchmarks
+from compact import compact
+from simulation import HeadlessSwitch
+from test_simulation import played_game
+
+SEATS = ['simple', 'smart', 'smart']
+
+
+def test_compact__restores_state_and_play():
+    """Test if a restored table has the same state and plays on like the original."""
+    for seed in range(20):
+        game = played_game(SEATS, seed * 3, seed, max_turns=500)
+        table = compact(game)
+        restored = table.restore(HeadlessSwitch())
+        assert restored.snapshot() == game.snapshot()
+        assert [p.name for p in restored.players] == [p.name for p in game.players]
+        assert list(restored.hand_sizes) == list(game.hand_sizes)
+        assert (restored.turns, restored.max_turns) == (game.turns, 500)
+        assert compact(restored) == table
+
+        random.seed(seed)
+        result = game.play()
+        random.seed(seed)
+        # Reshuffles are counted by HeadlessSwitch, not kept with the table.
+        assert restored.play()._replace(reshuffles=0) == result._replace(reshuffles=0)
+
+
+def test_compact__shares_limits_and_names():
+    """Test if tables with the same limits and names share them."""
+    first, second = compact(played_game(SEATS, 0, 1)), compact(played_game(SEATS, 0, 2))
+    assert first.limits is second.limits
+    assert all(a is b for a, b in zip(first.names, second.names))
+
+
+def test_compact__rejects_unknown_players():
+    """Test if players whose class is not in player_classes cannot be compacted."""
+    class Custom:
+        name = "Custom"
+        hand = []
+
+    game = HeadlessSwitch()
+    game.players = [Custom(), Custom()]
+    with pytest.raises(ValueError):
+        compact(game)
+
+
+def test_memory__compact_tables_are_smaller():
+    """Test if the memory benchmark measures compacted tables as smaller than live ones."""
+    live, packed = benchmarks.memory(tables=200)
+    assert 0 < packed < live
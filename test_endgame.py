@@ -0,0 +1,100 @@
+"""Test suite for the endgame solver of the switch game."""
+import random
+
+from cards import Card, DECK, Hand
+from endgame import EndgameSolver
+from players import EndgameAI, SmartAI
+from simulation import HeadlessSwitch
+from switch import GameState
+from test_montecarlo import cards
+from test_simulation import played_game
+
+
+class ScriptedPlayer:
+    """Player that makes the choices of an endgame.Move."""
+    is_ai = True
+
+    def __init__(self, game):
+        self.game = game
+        self.name = "Scripted"
+        self.hand = Hand()
+        self.move = None
+
+    def select_card(self, choices, _):
+        return self.move.card or False
+
+    def ask_for_swap(self, others):
+        return self.game.players[self.move.target]
+
+    def select_card_option(self, card, others):
+        return self.move.discard_drawn
+
+
+def test_moves__lead_to_the_positions_headless_switch_plays():
+    """Test if every move of the solver leads to the position HeadlessSwitch reaches by making it."""
+    rng = random.Random(0)
+    solver = EndgameSolver()
+    for _ in range(40):
+        game = played_game(['smart'] * 3, rng.randint(0, 30), rng=rng)
+        state = game.snapshot()
+        position = solver.position(state)
+        replay = HeadlessSwitch(rng=rng)
+        replay.players = [ScriptedPlayer(replay) for _ in range(3)]
+        for move, child in solver.moves(position):
+            if child is None:
+                continue
+            replay.restore(state)
+            replay.players[state.current].move = move
+            replay.turns = 0
+            result = replay.play(1)
+            if isinstance(child, int):
+                assert result is not None and result.winner == child
+            else:
+                assert result is None
+                assert EndgameSolver().position(replay.snapshot()) == child
+
+
+def test_solve__finds_the_winning_discard():
+    """Test if a player who can discard their last card wins for sure."""
+    hands = (cards('♣4 ♡9'), cards('♣K'), cards('♢5 ♢6'))
+    discards = cards('♣Q ♣7')
+    used = set(sum(hands, discards))
+    stock = tuple(card for card in DECK if card not in used)
+    state = GameState(hands, stock, discards, False, False, False, 1, 1)
+    solution = EndgameSolver().solve(state)
+    assert solution.values == (0.0, 1.0, 0.0)
+    assert solution.move.card is Card('♣', 'K')
+    assert solution.exact
+
+
+def test_solve__bounded_table_gives_the_same_exact_result():
+    """Test if a small transposition table evicts positions without changing exact results."""
+    hands = (cards('♣4 ♡9'), cards('♠K ♡2'), cards('♢5 ♢J'))
+    discards = cards('♣Q ♣7')
+    used = set(sum(hands, discards))
+    stock = tuple(card for card in random.Random(1).sample(DECK, 52) if card not in used)
+    state = GameState(hands, stock, discards, False, False, False, 1, 0)
+    solution = EndgameSolver(max_depth=8).solve(state)
+    small = EndgameSolver(max_depth=8, max_entries=50)
+    assert small.solve(state) == solution
+    assert len(small.table) <= 50 and small.evictions > 0
+
+
+def test_endgame_ai__plays_a_round():
+    """Test if a round with an EndgameAI is played to the end."""
+    rng = random.Random(4)
+    players = [EndgameAI('endgame', rng, samples=2, max_depth=4), SmartAI('smart 1', rng), SmartAI('smart 2', rng)]
+    game = HeadlessSwitch(players, rng)
+    result = game.run_round()
+    assert players[0].game is game
+    assert not players[result.winner].hand
+
+
+def test_endgame_ai__plays_a_round_with_two_decks():
+    """Test if an EndgameAI plays like a SmartAI in a round with two decks, which the solver does not solve."""
+    for seed in range(5):
+        rng = random.Random(seed)
+        players = [EndgameAI('endgame', rng, samples=2, max_depth=4), SmartAI('smart 1', rng), SmartAI('smart 2', rng)]
+        game = HeadlessSwitch(players, rng, decks=2)
+        result = game.run_round()
+        assert result.drawn or not players[result.winner].hand
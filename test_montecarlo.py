@@ -0,0 +1,67 @@
+"""Test suite for the Monte Carlo rollouts of MonteCarloAI."""
+import random
+
+import montecarlo
+from cards import DECK, Card
+from players import MonteCarloAI, SmartAI
+from simulation import HeadlessSwitch
+from switch import GameState
+
+
+def cards(text):
+    return tuple(Card(c[0], c[1:]) for c in text.split())
+
+
+def mid_round_state():
+    """Return a GameState of three players where player 0 is about to discard."""
+    hands = (cards('♣4 ♣J ♡K ♢Q'), cards('♣K ♣9 ♡8 ♠5 ♠7'), cards('♢5 ♢6 ♡2'))
+    discards = cards('♡3 ♣Q')
+    used = {card for hand in hands for card in hand} | set(discards)
+    stock = tuple(card for card in random.Random(0).sample(DECK, 52) if card not in used)
+    return GameState(hands, stock, discards, False, False, False, 1, 0)
+
+
+def test_determinize__keeps_what_the_player_sees():
+    """Test if only the other hands and the stock are dealt anew, in the same amounts."""
+    state = mid_round_state()
+    sample = montecarlo.determinize(state, 0, random.Random(1))
+    assert sample.hands[0] == state.hands[0]
+    assert sample.discards == state.discards
+    assert [len(hand) for hand in sample.hands] == [len(hand) for hand in state.hands]
+    assert len(sample.stock) == len(state.stock)
+    assert sorted(sum(sample.hands, sample.stock), key=id) == sorted(sum(state.hands, state.stock), key=id)
+    assert sample.hands[1:] != state.hands[1:]
+
+
+def test_evaluate__winning_discard_scores_one():
+    """Test if discarding the last card of a hand always wins."""
+    state = mid_round_state()
+    state = state._replace(hands=(cards('♣4'),) + state.hands[1:])
+    random.seed(0)
+    scores = montecarlo.evaluate(state, 0, montecarlo.CARD, [Card('♣', '4'), False], rollouts=8)
+    assert scores[0] == 1.0
+    assert 0.0 <= scores[1] < 1.0
+
+
+def test_evaluate__reproducible_across_workers():
+    """Test if without a time budget the scores only depend on the random state."""
+    state = mid_round_state()
+    moves = [Card('♣', '4'), Card('♢', 'Q'), False]
+    random.seed(2)
+    scores = montecarlo.evaluate(state, 0, montecarlo.CARD, moves, rollouts=16)
+    after = random.random()
+    random.seed(2)
+    assert montecarlo.evaluate(state, 0, montecarlo.CARD, moves, rollouts=16, workers=2) == scores
+    assert random.random() == after
+
+
+def test_monte_carlo_ai__plays_a_round():
+    """Test if a round with a MonteCarloAI is played to the end."""
+    random.seed(3)
+    players = [MonteCarloAI('mc', rollouts=2, time_budget=None), SmartAI('smart 1'), SmartAI('smart 2')]
+    game = HeadlessSwitch(players)
+    result = game.run_round()
+    assert players[0].game is game
+    assert not players[result.winner].hand
+    all_cards = game.stock + game.discards + [c for p in players for c in p.hand]
+    assert len(set(all_cards)) == len(all_cards) == 52
@@ -0,0 +1,96 @@
+"""Test suite for the players of the switch game."""
+import random
+
+from cards import Card, CountedHand, generate_deck
+from players import DEFAULT_WEIGHTS, SmartAI
+
+
+def rescan_select_card(hand, choices, hands):
+    """SmartAI.select_card computed by scanning the hand for every choice."""
+    def score(card):
+        in_suit = len([c for c in hand if c.suit == card.suit and c is not card])
+        offset = {
+            'J': 3*(hands[0]-1-min(hands[1:])),
+            'Q': 6 + in_suit,
+            '2': 4 + in_suit,
+            '8': 2 + in_suit,
+            'K': (3 if hands[-1] > hands[1] else -1) + in_suit,
+            'A': -2 + in_suit,
+        }
+        return offset.get(card.value, in_suit)
+    candidate = sorted(choices, key=score, reverse=True)[0]
+    return candidate if score(candidate) > -2 else None
+
+
+def rescan_select_card_option(hand, card, others):
+    """SmartAI.select_card_option computed by scanning the hand."""
+    same_suit = len([c for c in hand if c.suit == card.suit and c is not card])
+    different_suits = {c.suit for c in hand if c is not card}
+    qa_in_hand = len([c for c in hand if c.value in 'QA' and c is not card])
+    smallest = min(len(p.hand) for p in others)
+    if len(hand) >= 2:
+        if len(different_suits) < 4:
+            if card.value in 'QA' and qa_in_hand == 0:
+                return False
+            return same_suit != 0
+        return not (card.value == 'J' and len(hand) < smallest)
+    if card.value == 'J':
+        return not len(hand) < smallest
+    return True
+
+
+def test_counted_hand__keeps_counts_up_to_date():
+    """Test if CountedHand counts match its cards after every change."""
+    random.seed(0)
+    deck = generate_deck()
+    random.shuffle(deck)
+    hand = CountedHand(deck[:5])
+    for step in range(200):
+        if hand and random.random() < 0.5:
+            hand.remove(random.choice(hand))
+        elif deck:
+            card = deck.pop()
+            if card not in hand:
+                hand.append(card)
+        assert hand.suit_counts == [sum(c.suit_id == s for c in hand) for s in range(4)]
+        assert hand.rank_counts == [sum(c.rank_id == r for c in hand) for r in range(13)]
+        assert hand.qa_count == sum(c.value in 'QA' for c in hand)
+
+
+def test_smart_ai__matches_hand_rescans():
+    """Test if SmartAI decisions equal the decisions computed by rescanning the hand."""
+    random.seed(1)
+    player = SmartAI('Smart')
+    for _ in range(500):
+        deck = generate_deck()
+        random.shuffle(deck)
+        size = random.randint(1, 12)
+        cards = deck[:size]
+        hands = [size] + [random.randint(1, 12) for _ in range(random.randint(1, 3))]
+        choices = random.sample(cards, random.randint(1, size))
+        for hand in (CountedHand(cards), list(cards)):
+            player.hand = hand
+            assert player.select_card(choices, hands) is rescan_select_card(cards, choices, hands)
+
+            other = SmartAI('Other')
+            other.hand = deck[size:size + random.randint(1, 9)]
+            card = random.choice(cards + deck[-3:])
+            expected = rescan_select_card_option(cards, card, [other])
+            assert player.select_card_option(card, [other]) is expected
+
+
+def test_smart_ai__weights_change_decisions():
+    """Test if SmartAI decisions follow its weights."""
+    cards = [Card('♣', '4'), Card('♣', 'Q'), Card('♢', '9')]
+    player = SmartAI('Smart', weights={'draw4': -5})
+    player.hand = CountedHand(cards)
+    assert player.select_card(cards, [3, 5, 5]) is Card('♣', '4')
+    player.weights = {**DEFAULT_WEIGHTS, 'threshold': 100}
+    assert player.select_card(cards, [3, 5, 5]) is None
+    other = SmartAI('Other')
+    other.hand = [Card('♠', '2')] * 5
+    assert player.select_card_option(Card('♡', '5'), [other]) is False
+    player.weights = {**DEFAULT_WEIGHTS, 'keep_new_suit': 0}
+    assert player.select_card_option(Card('♡', '5'), [other]) is True
+    # Other players may be given as any sequence.
+    assert player.select_card_option(Card('♡', '5'), (other,)) is True
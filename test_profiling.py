@@ -0,0 +1,41 @@
+"""Test suite for profiling turns of the switch game."""
+import random
+
+from profiling import TurnProfiler
+from simulation import HeadlessSwitch, create_players
+from test_switch import mock_setup_round
+
+
+def test_profiler__counts_phases_and_effects():
+    """Test if the profiler counts phase calls and game effects."""
+    game = mock_setup_round(['♢2', '♢3', '♡4'], '', '♠3 ♠5 ♣6', skip=True)
+    players = game.players
+    with TurnProfiler(game) as profiler:
+        # The first player is skipped.
+        game.run_player(players[0])
+        # The discards are shuffled back and neither card can be discarded.
+        game.run_player(players[1])
+        game.run_player(players[2])
+        # No more cards can be drawn.
+        game.run_player(players[0])
+        game.swap_hands(players[0], players[1])
+    stats = profiler.stats()
+    assert stats['phases']['run_player']['calls'] == 4
+    assert stats['phases']['pick_up_card']['calls'] == 3
+    assert stats['phases']['discard_card']['calls'] == 0
+    assert stats['counters'] == {'skips': 1, 'reshuffles': 1, 'all cards distributed': 1, 'swaps': 1}
+
+
+def test_profiler__detach_restores_methods():
+    """Test if detaching the profiler restores the original methods."""
+    random.seed(0)
+    game = HeadlessSwitch(create_players(['smart', 'simple']))
+    profiler = TurnProfiler(game)
+    game.run_round()
+    profiler.detach()
+    assert 'run_player' not in vars(game)
+    # Detaching again, or before attaching, does nothing.
+    profiler.detach()
+    TurnProfiler().detach()
+    assert profiler.calls['run_player'] == game.turns
+    assert 'run_player' in profiler.summary()
@@ -0,0 +1,114 @@
+"""Test suite for binary records of switch games."""
+import random
+
+import records
+from cards import Hand
+from events import EventBus
+from switch import Switch
+from simulation import create_players
+
+
+def play_recorded_game(seats, seed, **limits):
+    """Play a recorded game with the limits of a Switch and return it with its record."""
+    game = Switch(EventBus(), **limits)
+    recorder = records.GameRecorder(game)
+    game.events.subscribe(recorder)
+    game.players = create_players(seats)
+    random.seed(seed)
+    game.run_round()
+    return game, recorder.record(seed, seats)
+
+
+def test_record_file__round_trip(tmp_path):
+    """Test if written records are read back unchanged, in order and by index."""
+    path = tmp_path / 'games.swgr'
+    written = [records.record_game(['simple', 'smart', 'smart'], seed) for seed in range(5)]
+    with records.RecordWriter(path) as writer:
+        for record in written[:3]:
+            writer.write(record)
+    # Appending to an existing file adds records after the existing ones.
+    with records.RecordWriter(path) as writer:
+        for record in written[3:]:
+            writer.write(record)
+    with records.RecordReader(path) as reader:
+        assert len(reader) == 5
+        assert [r.seed for r in reader] == list(range(5))
+        record = reader[3]
+        assert record.seats == ('simple', 'smart', 'smart')
+        assert bytes(record.deck) == written[3].deck
+        assert bytes(record.actions) == written[3].actions
+
+
+def test_replay__rebuilds_final_state():
+    """Test if replaying a whole record rebuilds the final state of the game."""
+    for seed in range(10):
+        game, record = play_recorded_game(['smart', 'simple', 'smart'], seed)
+        replayed = records.replay(record)
+        assert [p.hand for p in replayed.players] == [p.hand for p in game.players]
+        assert replayed.stock == game.stock
+        assert replayed.discards == game.discards
+        assert replayed.direction == game.direction
+        assert replayed.turns == records.count_turns(record)
+
+
+def test_replay__rebuilds_state_at_turn():
+    """Test if replaying part of a record rebuilds the game state after that turn."""
+    game = Switch(EventBus())
+    recorder = records.GameRecorder(game)
+    game.events.subscribe(recorder)
+    game.players = create_players(['smart', 'simple', 'smart'])
+    random.seed(11)
+    game.setup_round()
+    # Play turn by turn like Switch.run_round and capture the state after each turn.
+    states = []
+    i = 0
+    while True:
+        game.run_player(game.players[i])
+        # Hands hold their cards ordered by id, so they are compared as Hands.
+        states.append(([Hand(p.hand) for p in game.players], list(game.stock), list(game.discards)))
+        if not game.players[i].hand:
+            break
+        i = (i + game.direction) % len(game.players)
+    record = recorder.record(11, ['smart', 'simple', 'smart'])
+
+    for turns in (1, len(states) // 2, len(states)):
+        replayed = records.replay(record, turns)
+        hands, stock, discards = states[turns - 1]
+        assert [p.hand for p in replayed.players] == hands
+        assert replayed.stock == stock
+        assert replayed.discards == discards
+
+
+def test_record_file__multiple_decks(tmp_path):
+    """Test if records of rounds with two decks are read back and replayed to their final state."""
+    path = tmp_path / 'games.swgr'
+    played = []
+    for seed in range(5):
+        played.append(play_recorded_game(['smart'] * 8, seed, decks=2, max_players=8))
+    with records.RecordWriter(path) as writer:
+        for _, record in played:
+            writer.write(record)
+    with records.RecordReader(path) as reader:
+        for (game, written), record in zip(played, reader):
+            assert len(record.deck) == 104
+            assert bytes(record.actions) == written.actions
+            replayed = records.replay(record)
+            assert [p.hand for p in replayed.players] == [p.hand for p in game.players]
+            assert replayed.discards == game.discards
+
+
+def test_record_file__more_than_255_seats(tmp_path):
+    """Test if a record of a table with 300 seats is read back and replayed to its final state."""
+    path = tmp_path / 'games.swgr'
+    seats = ['smart', 'simple'] * 150
+    game, written = play_recorded_game(seats, 0, decks=41, max_players=300)
+    assert game.turns > len(seats)
+    with records.RecordWriter(path) as writer:
+        writer.write(written)
+    with records.RecordReader(path) as reader:
+        record = reader[0]
+    assert record.seats == tuple(seats)
+    replayed = records.replay(record)
+    assert replayed.turns == game.turns
+    assert [p.hand for p in replayed.players] == [p.hand for p in game.players]
+    assert replayed.discards == game.discards
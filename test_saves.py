@@ -0,0 +1,55 @@
+"""Test suite for binary saves of in-progress switch tables."""
+import pytest
+
+import saves
+from compact import compact
+from players import Player
+from simulation import HeadlessSwitch, create_players
+from switch import Switch
+from test_simulation import played_game
+
+SEATS = ['simple', 'smart', 'smart', 'smart']
+
+
+def test_save_table__round_trip():
+    """Test if a loaded table has the state, limits and turns of the saved one."""
+    for seed in range(20):
+        game = played_game(SEATS, seed * 2, seed, max_repetitions=None)
+        game.skip, game.draw4 = seed % 2 == 0, seed % 3 == 0
+        loaded = saves.load_table(saves.save_table(game), HeadlessSwitch())
+        assert loaded.snapshot() == game.snapshot()
+        assert compact(loaded) == compact(game)
+        assert loaded.max_repetitions is None
+        assert loaded.max_turns == game.max_turns
+
+
+def test_save_table__keeps_names_and_human_seats():
+    """Test if names are saved as UTF-8 and human seats are restored as humans."""
+    game = Switch()
+    game.players = [Player("Zoë ♠"), *create_players(['smart'])]
+    game.players[1].name = "Ada"
+    game.setup_round()
+    loaded = saves.load_table(saves.save_table(game), Switch())
+    assert [type(p) for p in loaded.players] == [type(p) for p in game.players]
+    assert [p.name for p in loaded.players] == ["Zoë ♠", "Ada"]
+    assert loaded.snapshot() == game.snapshot()
+
+
+def test_table_file__random_access(tmp_path):
+    """Test if a save file returns every table by index and in order."""
+    path = tmp_path / 'tables.swtb'
+    games = [played_game(SEATS, seed % 7, seed, decks=1 + seed % 2) for seed in range(300)]
+    saves.save_tables(path, games)
+    with saves.TableReader(path) as reader:
+        assert len(reader) == len(games)
+        for index in (299, 0, 150):
+            assert reader.load(index, HeadlessSwitch()).snapshot() == games[index].snapshot()
+        assert list(reader) == [compact(game) for game in games]
+
+
+def test_table_file__rejects_other_files(tmp_path):
+    """Test if a file without the save header is not read."""
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'SWGR\x01' + bytes(16))
+    with pytest.raises(ValueError):
+        saves.TableReader(path)
@@ -0,0 +1,42 @@
+"""Test suite for the random streams of switch games."""
+import random
+
+import seeding
+from simulation import HeadlessSwitch, create_players
+
+
+def seeded_game(seed):
+    game = HeadlessSwitch(create_players(['simple', 'smart', 'smart']))
+    seeding.seed_game(game, seed)
+    return game
+
+
+def test_stream__depends_only_on_seed_and_keys():
+    """Test if streams are recreated from their seed and keys and differ between keys."""
+    assert seeding.stream(3, 'seat', 1).random() == seeding.stream(3, 'seat', 1).random()
+    assert seeding.stream(3, 'seat', 1).random() != seeding.stream(3, 'seat', 2).random()
+    assert seeding.stream_seed(3, 'seat', 1) == '3:seat:1'
+
+
+def test_seed_game__reproducible_without_global_state():
+    """Test if a seeded round neither depends on nor changes the global random state."""
+    random.seed(0)
+    state = random.getstate()
+    first = seeded_game(5).run_round()
+    assert random.getstate() == state
+    random.seed(1)
+    assert seeded_game(5).run_round() == first
+
+
+def test_seed_game__interleaved_games_are_independent():
+    """Test if games played turn by turn in lockstep end like games played one after another."""
+    alone = [seeded_game(seed).run_round() for seed in range(4)]
+    games = [seeded_game(seed) for seed in range(4)]
+    results = [None] * len(games)
+    for game in games:
+        game.deal()
+    while None in results:
+        for idx, game in enumerate(games):
+            if results[idx] is None:
+                results[idx] = game.play(1)
+    assert results == alone
@@ -0,0 +1,77 @@
+"""Test suite for the asyncio server of the switch game."""
+import asyncio
+import random
+
+import pytest
+
+import loadtest
+import server
+from events import EventBus
+from simulation import create_players
+from switch import Switch
+
+
+def test_async_switch__plays_like_switch():
+    """Test if an AsyncSwitch round of AI players emits the same events as Switch.run_round."""
+    seen = {}
+    for cls in (Switch, server.AsyncSwitch):
+        events = []
+        game = cls(EventBus(events.append))
+        game.players = create_players(['simple', 'smart', 'smart'])
+        random.seed(4)
+        result = game.run_round()
+        if cls is server.AsyncSwitch:
+            assert asyncio.run(result) is game.players[game.current]
+        seen[cls] = [(type(event).__name__, getattr(event, 'card', None)) for event in events]
+    assert seen[Switch] == seen[server.AsyncSwitch]
+
+
+def test_load_test__all_bots_finish_their_rounds():
+    """Test if many concurrent bots each finish a round."""
+    random.seed(5)
+    result = asyncio.run(loadtest.local_load_test(50, humans=2, ais=['smart']))
+    assert result.rounds == 50
+    assert result.failures == 0
+    assert result.prompts == len(result.latencies) > 0
+
+
+async def talk(port, answers):
+    """Connect to a server, send answers to its first prompts and return all received lines."""
+    reader, writer = await asyncio.open_connection(server.DEFAULT_HOST, port)
+    lines = []
+    answers = iter(answers)
+    while line := (await reader.readline()).decode():
+        lines.append(line)
+        if line.split(' ')[0] in ('WELCOME', 'RETRY', *loadtest.PROMPTS):
+            answer = next(answers, None)
+            if answer is None:
+                break
+            writer.write(f"{answer}\n".encode())
+    writer.close()
+    return lines
+
+
+def test_server__retries_invalid_input_and_plays_for_disconnected_players():
+    """Test if invalid answers are asked again and a disconnected player's round goes on."""
+    async def play():
+        switch_server = server.SwitchServer(1, ['smart'])
+        async with await switch_server.start(server.DEFAULT_HOST, 0) as listener:
+            port = listener.sockets[0].getsockname()[1]
+            lines = await talk(port, ['Tester', 'x', 0])
+            while switch_server.tables:
+                await asyncio.sleep(0.01)
+        return lines, switch_server.rounds
+
+    random.seed(6)
+    lines, rounds = asyncio.run(play())
+    assert lines[0].startswith('WELCOME')
+    assert [line.split(' ')[0] for line in lines].count('RETRY') == 2
+    assert rounds == 1
+
+
+def test_server__rejects_searching_ais():
+    """Test if only AI players that do not stall the event loop take seats."""
+    for typ in ('montecarlo', 'endgame', 'human'):
+        with pytest.raises(ValueError):
+            server.SwitchServer(1, ['smart', typ])
+    assert server.SwitchServer(1, list(server.AI_TYPES)).ais == server.AI_TYPES
@@ -0,0 +1,62 @@
+"""Test suite for the headless simulation of the switch game."""
+import random
+
+import simulation
+import switch
+
+
+def played_game(seats, turns, seed=None, **options):
+    """Return a HeadlessSwitch of AI players after some turns of a dealt round.
+
+    Parameters:
+    seats - sequence of player_classes keys of the players;
+    turns - number of turns to play.
+
+    Keyword arguments:
+    seed - seed of the global random state, or None to keep it (default None);
+    options - the rng and limits of the HeadlessSwitch.
+    """
+    if seed is not None:
+        random.seed(seed)
+    game = simulation.HeadlessSwitch(simulation.create_players(seats), **options)
+    game.deal()
+    game.play(turns)
+    return game
+
+
+def test_play_round__returns_winner_with_empty_hand():
+    """Test if a headless round ends with the winner holding no cards."""
+    random.seed(1)
+    game = simulation.HeadlessSwitch(simulation.create_players(['simple', 'smart', 'smart']))
+    result = game.run_round()
+    assert 0 <= result.winner < 3
+    assert not game.players[result.winner].hand
+    assert result.turns > 0
+    assert result.reshuffles >= 0
+
+
+def test_play_round__conserves_cards():
+    """Test if no cards are created or lost during headless rounds."""
+    random.seed(2)
+    game = simulation.HeadlessSwitch(simulation.create_players(['smart', 'simple']))
+    for _ in range(20):
+        game.run_round()
+        cards = game.stock + game.discards + [c for p in game.players for c in p.hand]
+        assert len(cards) == 52
+        assert len(set(cards)) == 52
+
+
+def test_play_round__prints_nothing(capsys):
+    """Test if headless rounds do not produce any output."""
+    random.seed(3)
+    for _ in range(10):
+        simulation.play_round(['simple', 'smart'])
+    assert capsys.readouterr().out == ''
+
+
+def test_run_round__drawn_at_turn_cap():
+    """Test if a headless round that reaches max_turns is drawn without a winner."""
+    random.seed(4)
+    game = simulation.HeadlessSwitch(simulation.create_players(['simple', 'smart']), max_turns=5)
+    result = game.run_round()
+    assert result == simulation.RoundResult(None, 5, 0, switch.TURN_CAP)
@@ -1,8 +1,13 @@
 """Test suite for the switch game."""
 from copy import deepcopy
+
+import pytest
+
 import switch
 
-from cards import Card
+from cards import Card, MaskHand, generate_deck
+from events import CardDiscarded, DirectionReversed, Drawn, EventBus, NullEventBus
+from players import SimpleAI
 
 
 class MockPlayer:
@@ -29,6 +34,14 @@ class MockPlayer:
         """
         return others[0]
 
+    @staticmethod
+    def select_card_option(card, others):
+        """Select an option of what to do with a drawn card.
+
+        Always discards the drawn card.
+        """
+        return True
+
 
 def mock_setup_round(hands, stock, discards, **flags):
     """Set up a specific game state."""
@@ -232,3 +245,150 @@ def test_run_player__adheres_to_skip_flag():
     game.run_player(player)
     assert player.hand == hand_before
     assert not game.skip
+
+
+def test_get_discardable_cards__mask_hand_matches_list():
+    """Test if a MaskHand has the same discardable cards as a list hand."""
+    game = mock_setup_round([], '', '♣5')
+    hand = [Card(suit, value) for suit in Card.suits for value in '2 5 8 Q A K'.split()]
+    expected = sorted(game.get_discardable_cards(hand), key=lambda card: card.id)
+    assert game.get_discardable_cards(MaskHand(hand)) == expected
+    assert len(expected) == 6 + 3*3
+
+
+def test_can_discard__table_matches_rule():
+    """Test if the discard table and masks agree with the rule for all pairs of cards."""
+    for top_card in generate_deck():
+        game = mock_setup_round([], '', '')
+        game.discards = [top_card]
+        for card in generate_deck():
+            expected = switch.is_discardable(card, top_card)
+            assert game.can_discard(card) is expected
+            assert bool(switch.PLAYABLE_MASKS[top_card.id] & card.mask) is expected
+
+
+def test_events__delivered_to_subscribers():
+    """Test if game events are delivered to subscribers of the event bus."""
+    game = mock_setup_round(['♣4 ♡K', '♣K ♣9'], '♢5 ♢6 ♢7 ♢8', '♡3')
+    received = []
+    game.events = EventBus(received.append)
+    game.discard_card(game.players[0], Card('♡', 'K'))
+    assert received == [CardDiscarded(game.players[0], Card('♡', 'K')), DirectionReversed(-1)]
+
+
+def test_events__null_bus_prints_nothing(capsys):
+    """Test if a game with a NullEventBus produces no output."""
+    game = mock_setup_round(['♣4 ♡J', '♣K ♣9'], '♢5 ♢6 ♢7 ♢8', '♡3')
+    game.events = NullEventBus()
+    game.run_player(game.players[0])
+    game.run_player(game.players[1])
+    assert capsys.readouterr().out == ''
+
+
+def test_snapshot__restore_undoes_turns():
+    """Test if restoring a snapshot undoes the turns played since."""
+    game = mock_setup_round(['♣4 ♡J ♡K', '♣K ♣9 ♡8', '♢5 ♢6'], '♢7 ♢8 ♠2 ♠3', '♡3 ♡Q', draw2=True)
+    game.players[1].hand = MaskHand(game.players[1].hand)
+    state = game.snapshot()
+    before = deepcopy([p.hand for p in game.players]), list(game.stock), list(game.discards)
+    for player in game.players * 2:
+        game.run_player(player)
+    game.restore(state)
+    assert ([p.hand for p in game.players], game.stock, game.discards) == before
+    assert game.snapshot() == state
+    # A J swap moves hand objects between players; the MaskHand still matches its new cards.
+    mask_hand = next(p.hand for p in game.players if isinstance(p.hand, MaskHand))
+    assert mask_hand.mask == sum(card.mask for card in mask_hand)
+
+
+def test_pick_up_card__reshuffles_in_place():
+    """Test if reshuffling reuses the stock and discard lists instead of copying them."""
+    game = mock_setup_round(['♣4', '♣9'], '♠7', '♠5 ♢6 ♡3')
+    game.events = NullEventBus()
+    stock, discards = game.stock, game.discards
+    picked = game.pick_up_card(game.players[0], 3)
+    assert picked == 3
+    assert game.stock is discards and game.discards is stock
+    assert game.stock == [] and game.discards == [Card('♡', '3')]
+    assert game.players[0].hand[1] == Card('♠', '7')
+    assert sorted(game.players[0].hand[2:], key=id) == sorted([Card('♠', '5'), Card('♢', '6')], key=id)
+
+
+def test_hand_sizes__follow_turns_and_swaps():
+    """Test if the hand sizes of the game stay in step with the hands as turns are played."""
+    game = mock_setup_round(['♣4 ♡J ♡K', '♣K ♣9 ♡8', '♢5 ♢6'], '♢7 ♢8 ♠2 ♠3', '♡3 ♡Q', draw2=True)
+    game.events = NullEventBus()
+    for player in game.players * 2:
+        game.run_player(player)
+        game.advance()
+        assert list(game.hand_sizes) == [len(p.hand) for p in game.players]
+    sizes = game.get_normalized_hand_sizes(game.players[1])
+    assert sizes[0] == len(game.players[1].hand)
+    assert sizes[-1] == sizes[len(sizes) - 1]
+    assert list(sizes) == sizes[:]
+
+
+def test_setup_round__deals_large_tables_from_several_decks():
+    """Test if the limits of a game set the numbers of decks, players and cards dealt."""
+    game = switch.Switch(NullEventBus(), decks=3, hand_size=5, max_players=30)
+    game.players = [MockPlayer([]) for _ in range(30)]
+    game.setup_round()
+    assert all(len(player.hand) == 5 for player in game.players)
+    assert len(game.stock) + len(game.discards) == 3 * 52 - 30 * 5
+    game.players.append(MockPlayer([]))
+    with pytest.raises(ValueError):
+        game.setup_round()
+    game = switch.Switch(NullEventBus(), hand_size=13, max_players=30)
+    game.players = [MockPlayer([]) for _ in range(4)]
+    with pytest.raises(ValueError):
+        game.setup_round()
+
+
+def test_others__views_the_other_players():
+    """Test if the other players of a seat are offered in seat order with their hand sizes."""
+    game = mock_setup_round(['♣4', '♣K ♣9', '♡J ♢5 ♢6', '♠2 ♠3 ♠4 ♠5'], '♢7 ♢8', '♡3')
+    others = game.others(game.players[1])
+    assert list(others) == [game.players[0], game.players[2], game.players[3]]
+    assert others[1] is others[-2] is game.players[2]
+    assert others.hand_sizes() == [1, 3, 4]
+
+
+def test_draw_reason__detects_stalled_round():
+    """Test if a round in which nobody can discard or draw is drawn by repetition."""
+    game = mock_setup_round(['♣4 ♢6', '♣9 ♠5'], '', '♡3')
+    game.events = NullEventBus()
+    for _ in range(20):
+        reason = game.draw_reason()
+        if reason:
+            break
+        game.run_player(game.players[game.current])
+        game.turns += 1
+        game.advance()
+    assert reason == switch.REPETITION
+    assert game.turns == 2 * (switch.MAX_REPETITIONS - 1)
+
+
+def test_run_round__drawn_at_turn_cap():
+    """Test if run_round ends a round without a winner after max_turns turns."""
+    received = []
+    game = switch.Switch(EventBus(received.append), max_turns=3)
+    game.players = [SimpleAI("A"), SimpleAI("B")]
+    game.run_round()
+    assert game.turns == 3
+    assert received[-1] == Drawn(switch.TURN_CAP)
+    assert all(player.hand for player in game.players)
+
+
+def test_restore__forgets_repetitions():
+    """Test if a restored state is not drawn early because of states seen before the restore."""
+    game = mock_setup_round(['♣4 ♢6', '♣9 ♠5'], '', '♡3')
+    game.events = NullEventBus()
+    state = game.snapshot()
+    for _ in range(5):
+        game.restore(state)
+        game.turns = 0
+        while not game.draw_reason():
+            game.run_player(game.players[game.current])
+            game.turns += 1
+            game.advance()
+        assert game.turns == 2 * (switch.MAX_REPETITIONS - 1)
@@ -0,0 +1,25 @@
+"""Test suite for switch game tournaments."""
+import pytest
+
+import tournament
+
+
+def test_run_tournament__counts_all_games():
+    """Test if every game of a tournament has exactly one winner or is drawn."""
+    result = tournament.run_tournament(['simple', 'smart'], 50, master_seed=1, workers=1)
+    assert result.games == 50
+    assert sum(result.wins) + result.draws == 50
+
+
+def test_run_tournament__independent_of_workers():
+    """Test if a master seed gives the same result for any number of workers."""
+    seats = ['simple', 'smart', 'smart']
+    single = tournament.run_tournament(seats, 60, master_seed=7, workers=1)
+    pooled = tournament.run_tournament(seats, 60, master_seed=7, workers=2, chunk_size=7)
+    assert single == pooled
+
+
+def test_run_tournament__rejects_human_seats():
+    """Test if human players cannot take part in a tournament."""
+    with pytest.raises(ValueError):
+        tournament.run_tournament(['human', 'smart'], 10, workers=1)
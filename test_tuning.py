@@ -0,0 +1,26 @@
+"""Test suite for the tuning of the SmartAI weights."""
+from concurrent.futures import ProcessPoolExecutor
+
+import tuning
+from players import DEFAULT_WEIGHTS, load_weights
+
+
+def test_evaluate__same_games_for_every_candidate_and_pool():
+    """Test if equal candidates score the same and a pool plays the same games."""
+    changed = {**DEFAULT_WEIGHTS, 'threshold': 10}
+    candidates = [DEFAULT_WEIGHTS, changed, DEFAULT_WEIGHTS]
+    single = tuning.evaluate(candidates, 30, 'test')
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        pooled = tuning.evaluate(candidates, 30, 'test', pool=pool, chunk_size=7)
+    assert single == pooled
+    assert single[0] == single[2]
+
+
+def test_tune__saves_weights_smart_ai_can_load(tmp_path):
+    """Test if a short tuning run returns all weights and saves them in a loadable file."""
+    result = tuning.tune(generations=2, population=4, games=12, workers=1)
+    assert set(result.weights) == set(DEFAULT_WEIGHTS)
+    assert len(result.history) == 2
+    path = tmp_path / 'weights.json'
+    tuning.save_weights(result.weights, path)
+    assert load_weights(path) == {name: round(value, 3) for name, value in result.weights.items()}
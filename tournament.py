@@ -0,0 +1,127 @@
+"""Multi-core tournaments between AI players of the switch game."""
+import argparse
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from players import player_classes
+from seeding import seed_game, stream_seed
+from simulation import HeadlessSwitch, create_players
+
+
+# Aggregate statistics of a tournament: the number of games played,
+# a list of wins per seat, the total number of turns and reshuffles,
+# and the number of drawn (aborted) games, which no seat won.
+TournamentResult = namedtuple('TournamentResult', ['games', 'wins', 'turns', 'reshuffles', 'draws'])
+
+
+def game_seed(master_seed, index):
+    """Return the seed of a single game of a tournament.
+
+    Each game is seeded from the master seed and its own index, so the outcome
+    of a game does not depend on which worker plays it or in what order.
+    """
+    return stream_seed(master_seed, index)
+
+
+def run_games(seats, master_seed, start, stop):
+    """Play the games with indices in range(start, stop).
+
+    Parameters:
+    seats - sequence of player_classes keys of AI players;
+    master_seed - seed of the whole tournament;
+    start, stop - range of game indices to play.
+
+    Returns a TournamentResult of the played games.
+    """
+    game = HeadlessSwitch(create_players(seats))
+    wins = [0] * len(seats)
+    turns = 0
+    reshuffles = 0
+    draws = 0
+    for index in range(start, stop):
+        seed_game(game, game_seed(master_seed, index))
+        result = game.run_round()
+        if result.winner is None:
+            draws += 1
+        else:
+            wins[result.winner] += 1
+        turns += result.turns
+        reshuffles += result.reshuffles
+    return TournamentResult(stop - start, wins, turns, reshuffles, draws)
+
+
+def merge_results(results, seats):
+    """Merge partial TournamentResults into a single one."""
+    wins = [0] * len(seats)
+    games = turns = reshuffles = draws = 0
+    for result in results:
+        games += result.games
+        turns += result.turns
+        reshuffles += result.reshuffles
+        draws += result.draws
+        for seat, count in enumerate(result.wins):
+            wins[seat] += count
+    return TournamentResult(games, wins, turns, reshuffles, draws)
+
+
+def run_tournament(seats, games, master_seed=0, workers=None, chunk_size=None):
+    """Play a tournament of headless games, spread across a process pool.
+
+    Parameters:
+    seats - sequence of player_classes keys of AI players;
+    games - total number of games to play.
+
+    Keyword arguments:
+    master_seed - seed from which every game's seed is derived (default 0);
+    workers - number of worker processes, 1 runs in this process (default os.cpu_count());
+    chunk_size - games per task sent to a worker (default: 4 tasks per worker).
+
+    Returns a TournamentResult. For a given master seed the result is the same
+    regardless of the number of workers and the chunk size.
+    """
+    for typ in seats:
+        if typ not in player_classes or not player_classes[typ].is_ai:
+            raise ValueError(f"Seat type must be an AI in player_classes: {typ!r}")
+    if len(seats) < 2:
+        raise ValueError("A tournament needs at least 2 seats")
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return run_games(seats, master_seed, 0, games)
+
+    # Large chunks keep the inter-process communication small, while
+    # several chunks per worker keep all workers busy until the end.
+    if chunk_size is None:
+        chunk_size = max(1, -(-games // (workers * 4)))
+    bounds = [(start, min(start + chunk_size, games)) for start in range(0, games, chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_games, seats, master_seed, start, stop) for start, stop in bounds]
+        return merge_results((future.result() for future in futures), seats)
+
+
+def main():
+    """Run a tournament from the command line and print its statistics."""
+    parser = argparse.ArgumentParser(description="Run a tournament between Switch AI players.")
+    parser.add_argument('seats', nargs='+', choices=[k for k, v in player_classes.items() if v.is_ai],
+                        help="seat line-up of AI player types")
+    parser.add_argument('-n', '--games', type=int, default=10000, help="number of games")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="master seed")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="number of worker processes")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = run_tournament(args.seats, args.games, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for seat, (typ, wins) in enumerate(zip(args.seats, result.wins)):
+        print(f"Seat {seat + 1} ({typ}): {wins} wins ({wins / result.games:.2%})")
+    print(f"Drawn: {result.draws} games ({result.draws / result.games:.2%})")
+    print(f"Average turns: {result.turns / result.games:.1f}")
+    print(f"Average reshuffles: {result.reshuffles / result.games:.2f}")
+    print(f"{result.games / elapsed:.1f} games/sec")
+
+
+if __name__ == '__main__':
+    main()
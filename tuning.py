@@ -0,0 +1,181 @@
+"""Tuning of the SmartAI weights with an evolution strategy.
+
+Every generation, candidate weights are sampled around the current mean
+weights. Each candidate plays SmartAI in turn in every seat against default
+SmartAI opponents, and the mean moves towards the candidates that win most
+often. All candidates of a generation play the same deals with the same
+random streams (common random numbers), so the differences between their
+win rates are due to their weights rather than to their cards, and far
+fewer games are needed to tell them apart. Games are spread across a pool
+of worker processes.
+
+Tune the weights and save them with
+
+    $ python3 tuning.py --generations 20 --population 16 --games 2000 --output smart_weights.json
+
+and load them into a player with
+
+    >>> SmartAI('Tuned', weights=players.load_weights('smart_weights.json'))
+"""
+import argparse
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from players import DEFAULT_WEIGHTS, SmartAI
+from seeding import seed_game, stream, stream_seed
+from simulation import HeadlessSwitch, create_players
+
+
+# Opponents of the tuned player by default.
+OPPONENTS = ('smart', 'smart')
+# Names of the tuned weights, in the order of the vectors of the search.
+TUNED = tuple(DEFAULT_WEIGHTS)
+# Rounds not won within this many turns are drawn and count as lost for the
+# candidate, as weights that hardly ever discard can keep a round going for long.
+MAX_TURNS = 1000
+# Lowest spread of a weight, which keeps the search from collapsing on a noisy winner.
+MIN_SIGMA = 0.05
+
+# Result of a tuning run: the tuned weights, the win rates of the tuned and default weights
+# on the same games of a final evaluation, and a list of the win rates of the mean weights by generation.
+TuningResult = namedtuple('TuningResult', ['weights', 'win_rate', 'default_win_rate', 'history'])
+
+
+def play_games(weights, opponents, master_seed, start, stop):
+    """Play the games with indices in range(start, stop) of a candidate.
+
+    Parameters:
+    weights - dict of SmartAI weights of the candidate;
+    opponents - sequence of player_classes keys of the other seats;
+    master_seed - seed of the games;
+    start, stop - range of game indices to play.
+
+    The candidate takes seat index % seats of game index, so it plays every
+    seat equally often. Returns the number of games won by the candidate
+    within MAX_TURNS.
+    """
+    seats = len(opponents) + 1
+    games = []
+    for seat in range(seats):
+        players = create_players(opponents)
+        players.insert(seat, SmartAI(f"tuned {seat + 1}", weights=weights))
+        games.append(HeadlessSwitch(players, max_turns=MAX_TURNS))
+    wins = 0
+    for index in range(start, stop):
+        seat = index % seats
+        game = games[seat]
+        seed_game(game, stream_seed(master_seed, index))
+        if game.run_round().winner == seat:
+            wins += 1
+    return wins
+
+
+def evaluate(candidates, games, master_seed, opponents=OPPONENTS, pool=None, chunk_size=None):
+    """Return the win rates of candidate weights, all playing the same games.
+
+    Parameters:
+    candidates - list of dicts of SmartAI weights;
+    games - number of games of every candidate;
+    master_seed - seed of the games, shared by all candidates.
+
+    Keyword arguments:
+    opponents - sequence of player_classes keys of the other seats (default OPPONENTS);
+    pool - executor to play the games in, or None to play them in this process (default None);
+    chunk_size - games per task sent to the pool (default: games split into 4 tasks).
+    """
+    if pool is None:
+        return [play_games(weights, opponents, master_seed, 0, games) / games for weights in candidates]
+    chunk_size = chunk_size or max(1, -(-games // 4))
+    bounds = [(start, min(start + chunk_size, games)) for start in range(0, games, chunk_size)]
+    futures = [[pool.submit(play_games, weights, opponents, master_seed, start, stop) for start, stop in bounds]
+               for weights in candidates]
+    return [sum(future.result() for future in chunks) / games for chunks in futures]
+
+
+def to_weights(vector):
+    """Return the dict of weights of a vector of the search."""
+    return dict(zip(TUNED, vector))
+
+
+def tune(generations=20, population=16, games=1000, opponents=OPPONENTS, sigma=1.0, seed=0, workers=None,
+         report=None):
+    """Tune the SmartAI weights with a cross-entropy evolution strategy.
+
+    Keyword arguments:
+    generations - number of generations (default 20);
+    population - number of candidates per generation, including the mean (default 16);
+    games - number of games of every candidate per generation (default 1000);
+    opponents - sequence of player_classes keys of the other seats (default OPPONENTS);
+    sigma - initial spread of every weight (default 1.0);
+    seed - seed of the sampling and of the games (default 0);
+    workers - number of worker processes, 1 plays in this process (default os.cpu_count());
+    report - function called with the generation and the win rate of its mean, or None (default None).
+
+    Every generation plays new games, which all of its candidates share.
+    The quarter of the candidates that win most often become the next mean
+    and spreads. Finally the tuned and the default weights play the same
+    new games. Returns a TuningResult.
+    """
+    rng = stream(seed, 'sampling')
+    mean = [float(DEFAULT_WEIGHTS[name]) for name in TUNED]
+    sigmas = [sigma] * len(TUNED)
+    elite = max(2, population // 4)
+    history = []
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for generation in range(generations):
+            # The mean is evaluated alongside its samples, which tracks progress on the same games.
+            vectors = [mean] + [[rng.gauss(m, s) for m, s in zip(mean, sigmas)] for _ in range(population - 1)]
+            scores = evaluate([to_weights(vector) for vector in vectors], games, stream_seed(seed, generation),
+                              opponents, pool)
+            history.append(scores[0])
+            if report is not None:
+                report(generation, scores[0])
+            ranked = sorted(range(len(vectors)), key=lambda idx: scores[idx], reverse=True)[:elite]
+            best = [vectors[idx] for idx in ranked]
+            mean = [sum(column) / elite for column in zip(*best)]
+            sigmas = [max(MIN_SIGMA, (sum((x - m) ** 2 for x in column) / elite) ** 0.5)
+                      for column, m in zip(zip(*best), mean)]
+        weights = to_weights(mean)
+        win_rate, default_win_rate = evaluate([weights, DEFAULT_WEIGHTS], games, stream_seed(seed, 'final'),
+                                              opponents, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return TuningResult(weights, win_rate, default_win_rate, history)
+
+
+def save_weights(weights, path):
+    """Save SmartAI weights to a JSON file, which players.load_weights reads."""
+    with open(path, 'w') as file:
+        json.dump({name: round(value, 3) for name, value in weights.items()}, file, indent=2)
+
+
+def main():
+    """Tune the SmartAI weights from the command line and save them."""
+    parser = argparse.ArgumentParser(description="Tune the weights of the SmartAI strategy.")
+    parser.add_argument('-g', '--generations', type=int, default=20, help="number of generations")
+    parser.add_argument('-p', '--population', type=int, default=16, help="candidates per generation")
+    parser.add_argument('-n', '--games', type=int, default=1000, help="games per candidate and generation")
+    parser.add_argument('--opponents', nargs='+', default=list(OPPONENTS), help="player_classes keys of the opponents")
+    parser.add_argument('--sigma', type=float, default=1.0, help="initial spread of the weights")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="seed of the search and the games")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="number of worker processes")
+    parser.add_argument('-o', '--output', default='smart_weights.json', help="JSON file of the tuned weights")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = tune(args.generations, args.population, args.games, args.opponents, args.sigma, args.seed,
+                  args.workers, report=lambda generation, rate: print(f"Generation {generation + 1}: {rate:.2%}"))
+    save_weights(result.weights, args.output)
+    print(f"Tuned weights win {result.win_rate:.2%}, default weights {result.default_win_rate:.2%} "
+          f"of the same games")
+    print(f"Saved weights to {args.output} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 """Command line interface for the switch game."""
 import random
 
+import events
+
 
 def print_message(msg):
     """Print out a message to UI."""
@@ -9,7 +11,7 @@ def print_message(msg):
 
 def say_welcome():
     """Print a welcome message."""
-    print_message("Welcome to Switch v1.3.2")
+    print_message("Welcome to Switch v1.28.2")
 
 
 def print_game_menu():
@@ -45,6 +47,47 @@ def print_winner_of_game(player):
     print_message(80*'-')
 
 
+def print_event(event):
+    """Print out a game event to UI."""
+    typ = type(event)
+    if typ is events.TurnStarted:
+        direction = "Clockwise" if event.direction == 1 else "Anti-clockwise"
+        print_player_info(event.player, event.top_card, event.index, direction)
+    elif typ is events.PlayerSkipped:
+        print_message(f"{event.player.name} is skipped.")
+    elif typ is events.CardsDrawn:
+        print_message(f"{event.player.name} draws {event.amount} cards.")
+    elif typ is events.DrawingCard:
+        # Differentiate whether the player chose not to discard or had no discardable cards.
+        if event.voluntary:
+            print_message(f"{event.player.name} has chosen not to discard. Drawing ...")
+        else:
+            print_message("No matching card. Drawing ...")
+    elif typ is events.CardDiscarded:
+        print_discard_result(True, event.card)
+    elif typ is events.CardKept:
+        # Human players are informed by select_discard_choice.
+        if event.player.is_ai:
+            print_message(f"{event.player.name} has chosen to add the card to their hand.")
+    elif typ is events.DiscardRefused:
+        if event.player.is_ai:
+            print_message("Card cannot be discarded.")
+        else:
+            print_discard_result(False, event.card)
+    elif typ is events.DirectionReversed:
+        print_message("Game direction reversed.")
+    elif typ is events.HandsSwapped:
+        print_message(f"{event.player_1.name} swaps hands with {event.player_2.name}.")
+    elif typ is events.Reshuffled:
+        print_message("Discards are shuffled back.")
+    elif typ is events.StockExhausted:
+        print_message("All cards distributed")
+    elif typ is events.Won:
+        print_winner_of_game(event.player)
+    elif typ is events.Drawn:
+        print_message(f"\nThe game is drawn ({event.reason}), nobody wins.")
+
+
 def say_goodbye():
     """Print a goodbye message."""
     print_message("Goodbye!")